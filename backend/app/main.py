@@ -14,6 +14,7 @@ from logging.handlers import RotatingFileHandler
 from .routers import funds, ai, account, settings, data, strategy
 from .db import init_db
 from .services.scheduler import start_scheduler
+from .services.ai import aclose_http_client
 
 # Request size limit (10MB)
 MAX_REQUEST_SIZE = 10 * 1024 * 1024
@@ -110,7 +111,7 @@ async def lifespan(app: FastAPI):
     start_scheduler()
     yield
     # Shutdown
-    pass
+    await aclose_http_client()
 
 app = FastAPI(title="Fund Intraday Valuation API", lifespan=lifespan)
 
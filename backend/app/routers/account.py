@@ -4,7 +4,7 @@ from typing import Dict, Any, Optional, List
 
 from ..services.account import get_all_positions, upsert_position, remove_position
 from ..services.trade import add_position_trade, reduce_position_trade, list_transactions
-from ..db import get_db_connection
+from ..db import get_db_connection, get_write_connection
 
 router = APIRouter()
 
@@ -45,15 +45,13 @@ def list_accounts():
 def create_account(data: AccountModel):
     """创建新账户"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO accounts (name, description) VALUES (?, ?)",
-            (data.name, data.description)
-        )
-        account_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO accounts (name, description) VALUES (?, ?)",
+                (data.name, data.description)
+            )
+            account_id = cursor.lastrowid
         return {"id": account_id, "name": data.name}
     except Exception as e:
         if "UNIQUE constraint failed" in str(e):
@@ -64,14 +62,11 @@ def create_account(data: AccountModel):
 def update_account(account_id: int, data: AccountModel):
     """更新账户信息"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE accounts SET name = ?, description = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (data.name, data.description, account_id)
-        )
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            conn.execute(
+                "UPDATE accounts SET name = ?, description = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (data.name, data.description, account_id)
+            )
         return {"status": "ok"}
     except Exception as e:
         if "UNIQUE constraint failed" in str(e):
@@ -85,20 +80,17 @@ def delete_account(account_id: int):
         raise HTTPException(status_code=400, detail="默认账户不可删除")
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
 
-        # 检查是否有持仓
-        cursor.execute("SELECT COUNT(*) as cnt FROM positions WHERE account_id = ?", (account_id,))
-        count = cursor.fetchone()["cnt"]
+            # 检查是否有持仓（同一写事务内，检查与删除之间不会插入新持仓）
+            cursor.execute("SELECT COUNT(*) as cnt FROM positions WHERE account_id = ?", (account_id,))
+            count = cursor.fetchone()["cnt"]
 
-        if count > 0:
-            conn.close()
-            raise HTTPException(status_code=400, detail="账户下有持仓，无法删除")
+            if count > 0:
+                raise HTTPException(status_code=400, detail="账户下有持仓，无法删除")
 
-        cursor.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
-        conn.commit()
-        conn.close()
+            cursor.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
 
         return {"status": "ok"}
     except HTTPException:
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Body, HTTPException
 from typing import List, Dict, Any
 from pydantic import BaseModel, Field
 from ..services.ai import ai_service
-from ..db import get_db_connection
+from ..db import get_db_connection, get_write_connection
 
 router = APIRouter()
 
@@ -52,77 +52,68 @@ def get_prompts():
 @router.post("/ai/prompts")
 def create_prompt(data: PromptModel):
     """创建新的 AI 提示词模板"""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
 
-        # If this is set as default, unset other defaults
-        if data.is_default:
-            cursor.execute("UPDATE ai_prompts SET is_default = 0")
+            # If this is set as default, unset other defaults
+            if data.is_default:
+                cursor.execute("UPDATE ai_prompts SET is_default = 0")
 
-        cursor.execute("""
-            INSERT INTO ai_prompts (name, system_prompt, user_prompt, is_default)
-            VALUES (?, ?, ?, ?)
-        """, (data.name, data.system_prompt, data.user_prompt, 1 if data.is_default else 0))
+            cursor.execute("""
+                INSERT INTO ai_prompts (name, system_prompt, user_prompt, is_default)
+                VALUES (?, ?, ?, ?)
+            """, (data.name, data.system_prompt, data.user_prompt, 1 if data.is_default else 0))
 
-        prompt_id = cursor.lastrowid
-        conn.commit()
+            prompt_id = cursor.lastrowid
+        ai_service.invalidate_prompt_cache()
 
         return {"ok": True, "id": prompt_id}
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 @router.put("/ai/prompts/{prompt_id}")
 def update_prompt(prompt_id: int, data: PromptModel):
     """更新 AI 提示词模板"""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
 
-        # If this is set as default, unset other defaults
-        if data.is_default:
-            cursor.execute("UPDATE ai_prompts SET is_default = 0 WHERE id != ?", (prompt_id,))
+            # If this is set as default, unset other defaults
+            if data.is_default:
+                cursor.execute("UPDATE ai_prompts SET is_default = 0 WHERE id != ?", (prompt_id,))
 
-        cursor.execute("""
-            UPDATE ai_prompts
-            SET name = ?, system_prompt = ?, user_prompt = ?, is_default = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (data.name, data.system_prompt, data.user_prompt, 1 if data.is_default else 0, prompt_id))
+            cursor.execute("""
+                UPDATE ai_prompts
+                SET name = ?, system_prompt = ?, user_prompt = ?, is_default = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (data.name, data.system_prompt, data.user_prompt, 1 if data.is_default else 0, prompt_id))
 
-        conn.commit()
+        ai_service.invalidate_prompt_cache()
 
         return {"ok": True}
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 @router.delete("/ai/prompts/{prompt_id}")
 def delete_prompt(prompt_id: int):
     """删除 AI 提示词模板"""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
 
-        # Check if it's the default prompt
-        cursor.execute("SELECT is_default FROM ai_prompts WHERE id = ?", (prompt_id,))
-        row = cursor.fetchone()
+            # Check if it's the default prompt
+            cursor.execute("SELECT is_default FROM ai_prompts WHERE id = ?", (prompt_id,))
+            row = cursor.fetchone()
 
-        if row and row["is_default"]:
-            raise HTTPException(status_code=400, detail="不能删除默认模板")
+            if row and row["is_default"]:
+                raise HTTPException(status_code=400, detail="不能删除默认模板")
 
-        cursor.execute("DELETE FROM ai_prompts WHERE id = ?", (prompt_id,))
-        conn.commit()
+            cursor.execute("DELETE FROM ai_prompts WHERE id = ?", (prompt_id,))
+        ai_service.invalidate_prompt_cache()
 
         return {"ok": True}
     except HTTPException:
         raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
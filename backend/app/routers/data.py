@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException, Body
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response
 from typing import List, Optional
 from pydantic import BaseModel
-import json
-import io
 import datetime
+import orjson
 
 from ..services.data_io import export_data, import_data
+from ..services.ai import ai_service
 
 router = APIRouter()
 
@@ -47,13 +47,12 @@ def export_data_endpoint(modules: Optional[str] = None):
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"fundval_export_{timestamp}.json"
 
-        # 转换为 JSON 字符串
-        json_str = json.dumps(data, ensure_ascii=False, indent=2)
-        json_bytes = json_str.encode("utf-8")
+        # 直接编码为 UTF-8 JSON 字节（orjson 不转义非 ASCII 字符）
+        json_bytes = orjson.dumps(data, option=orjson.OPT_INDENT_2)
 
-        # 返回文件流
-        return StreamingResponse(
-            io.BytesIO(json_bytes),
+        # 返回文件
+        return Response(
+            json_bytes,
             media_type="application/json",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}"
@@ -86,6 +85,8 @@ def import_data_endpoint(request: ImportRequest = Body(...)):
 
         # 导入数据
         result = import_data(request.data, request.modules, request.mode)
+        if "ai_prompts" in request.modules:
+            ai_service.invalidate_prompt_cache()
 
         return result
 
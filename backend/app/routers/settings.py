@@ -1,7 +1,7 @@
 import logging
 import re
 from fastapi import APIRouter, HTTPException, Body
-from ..db import get_db_connection
+from ..db import get_db_connection, get_write_connection
 from ..crypto import encrypt_value, decrypt_value
 from ..config import Config
 
@@ -97,31 +97,28 @@ def update_settings(data: dict = Body(...)):
             raise HTTPException(status_code=400, detail={"errors": errors})
 
         # 保存到数据库
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        for key, value in settings.items():
-            # 跳过掩码值（用户没有修改）
-            if value == "***":
-                continue
-
-            # 判断是否需要加密
-            encrypted = 1 if key in ENCRYPTED_FIELDS else 0
-            if encrypted and value:
-                value = encrypt_value(value)
-
-            # Upsert
-            cursor.execute("""
-                INSERT INTO settings (key, value, encrypted, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(key) DO UPDATE SET
-                    value = excluded.value,
-                    encrypted = excluded.encrypted,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (key, value, encrypted))
-
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
+
+            for key, value in settings.items():
+                # 跳过掩码值（用户没有修改）
+                if value == "***":
+                    continue
+
+                # 判断是否需要加密
+                encrypted = 1 if key in ENCRYPTED_FIELDS else 0
+                if encrypted and value:
+                    value = encrypt_value(value)
+
+                # Upsert
+                cursor.execute("""
+                    INSERT INTO settings (key, value, encrypted, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value,
+                        encrypted = excluded.encrypted,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (key, value, encrypted))
 
         # 重新加载配置
         Config.reload()
@@ -170,38 +167,35 @@ def get_preferences():
 def update_preferences(data: dict = Body(...)):
     """更新用户偏好"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        if "watchlist" in data:
-            cursor.execute("""
-                INSERT INTO settings (key, value, encrypted, updated_at)
-                VALUES ('user_watchlist', ?, 0, CURRENT_TIMESTAMP)
-                ON CONFLICT(key) DO UPDATE SET
-                    value = excluded.value,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (data["watchlist"],))
-
-        if "currentAccount" in data:
-            cursor.execute("""
-                INSERT INTO settings (key, value, encrypted, updated_at)
-                VALUES ('user_current_account', ?, 0, CURRENT_TIMESTAMP)
-                ON CONFLICT(key) DO UPDATE SET
-                    value = excluded.value,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (str(data["currentAccount"]),))
-
-        if "sortOption" in data:
-            cursor.execute("""
-                INSERT INTO settings (key, value, encrypted, updated_at)
-                VALUES ('user_sort_option', ?, 0, CURRENT_TIMESTAMP)
-                ON CONFLICT(key) DO UPDATE SET
-                    value = excluded.value,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (data["sortOption"],))
-
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
+
+            if "watchlist" in data:
+                cursor.execute("""
+                    INSERT INTO settings (key, value, encrypted, updated_at)
+                    VALUES ('user_watchlist', ?, 0, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (data["watchlist"],))
+
+            if "currentAccount" in data:
+                cursor.execute("""
+                    INSERT INTO settings (key, value, encrypted, updated_at)
+                    VALUES ('user_current_account', ?, 0, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (str(data["currentAccount"]),))
+
+            if "sortOption" in data:
+                cursor.execute("""
+                    INSERT INTO settings (key, value, encrypted, updated_at)
+                    VALUES ('user_sort_option', ?, 0, CURRENT_TIMESTAMP)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (data["sortOption"],))
 
         return {"message": "偏好已保存"}
     except Exception as e:
@@ -1,7 +1,8 @@
-from typing import Any, Dict, List, Optional
+import functools
+from typing import Any, Dict, List, Literal, Optional
 
 from fastapi import APIRouter, Body, HTTPException, Query
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from ..services.strategy import (
     complete_rebalance_batch,
@@ -27,12 +28,37 @@ from ..services.strategy import (
 router = APIRouter()
 
 
-class HoldingModel(BaseModel):
+def _translate_errors(value_error_status: Optional[int] = 400):
+    """
+    Map service errors to HTTP: ValueError -> value_error_status (400 by
+    default, None to treat it like any other error), anything else -> 500.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except HTTPException:
+                raise
+            except ValueError as e:
+                raise HTTPException(status_code=value_error_status or 500, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+        return wrapper
+    return decorator
+
+
+class _RequestModel(BaseModel):
+    # Request bodies are read-only once parsed; reject unknown keys up front.
+    model_config = ConfigDict(frozen=True, extra="forbid", validate_assignment=False)
+
+
+class HoldingModel(_RequestModel):
     code: str = Field(..., min_length=1, max_length=20)
     weight: float = Field(..., gt=0)
 
 
-class CreatePortfolioModel(BaseModel):
+class CreatePortfolioModel(_RequestModel):
     name: str = Field(..., min_length=1, max_length=100)
     account_id: int = Field(..., ge=1)
     holdings: List[HoldingModel] = Field(..., min_length=1)
@@ -43,7 +69,7 @@ class CreatePortfolioModel(BaseModel):
     scope_codes: Optional[List[str]] = None
 
 
-class CreateVersionModel(BaseModel):
+class CreateVersionModel(_RequestModel):
     holdings: List[HoldingModel] = Field(..., min_length=1)
     effective_date: Optional[str] = None
     note: str = ""
@@ -53,7 +79,7 @@ class CreateVersionModel(BaseModel):
     fee_rate: Optional[float] = Field(None, ge=0, le=0.02)
 
 
-class RebalanceModel(BaseModel):
+class RebalanceModel(_RequestModel):
     account_id: int = Field(..., ge=1)
     min_deviation: float = Field(0.005, ge=0, le=0.2)
     fee_rate: Optional[float] = Field(None, ge=0, le=0.02)
@@ -63,29 +89,30 @@ class RebalanceModel(BaseModel):
     persist: bool = True
 
 
-class OrderStatusModel(BaseModel):
-    status: str = Field(..., pattern="^(suggested|executed|skipped)$")
+class OrderStatusModel(_RequestModel):
+    status: Literal["suggested", "executed", "skipped"]
 
 
-class ScopeUpdateModel(BaseModel):
+class ScopeUpdateModel(_RequestModel):
     scope_codes: List[str] = Field(default_factory=list)
 
-class ExecuteOrderModel(BaseModel):
+
+class ExecuteOrderModel(_RequestModel):
     executed_shares: float = Field(..., gt=0)
     executed_price: float = Field(..., gt=0)
     note: str = ""
 
 
-class OCRImageModel(BaseModel):
+class OCRImageModel(_RequestModel):
     image_data_url: str = Field(..., min_length=20)
 
 
-class BacktestModel(BaseModel):
+class BacktestModel(_RequestModel):
     account_id: int = Field(..., ge=1)
     start_date: str = Field(..., min_length=8)
     end_date: str = Field(..., min_length=8)
     initial_capital: float = Field(..., gt=0)
-    rebalance_mode: str = Field("threshold", pattern="^(none|threshold|periodic|hybrid)$")
+    rebalance_mode: Literal["none", "threshold", "periodic", "hybrid"] = "threshold"
     threshold: float = Field(0.005, ge=0, le=0.2)
     periodic_days: int = Field(20, ge=1, le=365)
     fee_rate: Optional[float] = Field(None, ge=0, le=0.02)
@@ -93,276 +120,194 @@ class BacktestModel(BaseModel):
 
 
 @router.get("/strategy/portfolios")
+@_translate_errors(None)
 def api_list_portfolios(account_id: Optional[int] = Query(None)):
-    try:
-        return {"portfolios": list_portfolios(account_id=account_id)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {"portfolios": list_portfolios(account_id=account_id)}
 
 
 @router.post("/strategy/portfolios")
+@_translate_errors()
 def api_create_portfolio(data: CreatePortfolioModel):
-    try:
-        result = create_portfolio(
-            name=data.name,
-            account_id=data.account_id,
-            holdings=[h.model_dump() for h in data.holdings],
-            benchmark=data.benchmark,
-            fee_rate=data.fee_rate,
-            effective_date=data.effective_date,
-            note=data.note,
-            scope_codes=data.scope_codes,
-        )
-        return {"ok": True, **result}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = create_portfolio(
+        name=data.name,
+        account_id=data.account_id,
+        holdings=[{"code": h.code, "weight": h.weight} for h in data.holdings],
+        benchmark=data.benchmark,
+        fee_rate=data.fee_rate,
+        effective_date=data.effective_date,
+        note=data.note,
+        scope_codes=data.scope_codes,
+    )
+    return {"ok": True, **result}
 
 
 @router.get("/strategy/portfolios/{portfolio_id}")
+@_translate_errors(404)
 def api_get_portfolio(portfolio_id: int):
-    try:
-        return get_portfolio_detail(portfolio_id)
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return get_portfolio_detail(portfolio_id)
 
 
 @router.delete("/strategy/portfolios/{portfolio_id}")
+@_translate_errors(404)
 def api_delete_portfolio(portfolio_id: int):
-    try:
-        return delete_portfolio(portfolio_id)
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return delete_portfolio(portfolio_id)
 
 
 @router.post("/strategy/portfolios/{portfolio_id}/delete")
+@_translate_errors(404)
 def api_delete_portfolio_post(portfolio_id: int):
-    try:
-        return delete_portfolio(portfolio_id)
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return delete_portfolio(portfolio_id)
 
 
 @router.post("/strategy/portfolios/{portfolio_id}/versions")
+@_translate_errors()
 def api_create_version(portfolio_id: int, data: CreateVersionModel):
-    try:
-        result = create_strategy_version(
-            portfolio_id=portfolio_id,
-            holdings=[h.model_dump() for h in data.holdings],
-            effective_date=data.effective_date,
-            note=data.note,
-            activate=data.activate,
-            scope_codes=data.scope_codes,
-            benchmark=data.benchmark,
-            fee_rate=data.fee_rate,
-        )
-        return {"ok": True, **result}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = create_strategy_version(
+        portfolio_id=portfolio_id,
+        holdings=[{"code": h.code, "weight": h.weight} for h in data.holdings],
+        effective_date=data.effective_date,
+        note=data.note,
+        activate=data.activate,
+        scope_codes=data.scope_codes,
+        benchmark=data.benchmark,
+        fee_rate=data.fee_rate,
+    )
+    return {"ok": True, **result}
 
 
 @router.patch("/strategy/portfolios/{portfolio_id}/scope")
+@_translate_errors()
 def api_update_portfolio_scope(portfolio_id: int, data: ScopeUpdateModel):
-    try:
-        return update_portfolio_scope(portfolio_id, data.scope_codes)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return update_portfolio_scope(portfolio_id, data.scope_codes)
 
 
 @router.get("/strategy/portfolios/{portfolio_id}/performance")
+@_translate_errors()
 def api_get_performance(portfolio_id: int, account_id: int = Query(..., ge=1)):
-    try:
-        return get_performance(portfolio_id, account_id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return get_performance(portfolio_id, account_id)
 
 
 @router.get("/strategy/portfolios/{portfolio_id}/positions")
+@_translate_errors()
 def api_get_positions_view(portfolio_id: int, account_id: int = Query(..., ge=1)):
-    try:
-        return get_portfolio_positions_view(portfolio_id, account_id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return get_portfolio_positions_view(portfolio_id, account_id)
 
 
 @router.get("/strategy/portfolios/{portfolio_id}/scope-candidates")
+@_translate_errors()
 def api_get_scope_candidates(portfolio_id: int, account_id: int = Query(..., ge=1)):
-    try:
-        return {"rows": get_portfolio_scope_candidates(portfolio_id, account_id)}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {"rows": get_portfolio_scope_candidates(portfolio_id, account_id)}
 
 
 @router.post("/strategy/holdings-ocr")
+@_translate_errors()
 def api_recognize_holdings(data: OCRImageModel):
-    try:
-        return recognize_holdings_from_image(data.image_data_url)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return recognize_holdings_from_image(data.image_data_url)
 
 
 @router.post("/strategy/portfolios/{portfolio_id}/backtest")
+@_translate_errors()
 def api_run_backtest(portfolio_id: int, data: BacktestModel):
-    try:
-        return run_backtest(
-            portfolio_id=portfolio_id,
-            account_id=data.account_id,
-            start_date=data.start_date,
-            end_date=data.end_date,
-            initial_capital=data.initial_capital,
-            rebalance_mode=data.rebalance_mode,
-            threshold=data.threshold,
-            periodic_days=data.periodic_days,
-            fee_rate=data.fee_rate,
-            cache_only=data.cache_only,
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return run_backtest(
+        portfolio_id=portfolio_id,
+        account_id=data.account_id,
+        start_date=data.start_date,
+        end_date=data.end_date,
+        initial_capital=data.initial_capital,
+        rebalance_mode=data.rebalance_mode,
+        threshold=data.threshold,
+        periodic_days=data.periodic_days,
+        fee_rate=data.fee_rate,
+        cache_only=data.cache_only,
+    )
 
 
 @router.post("/strategy/portfolios/{portfolio_id}/rebalance")
+@_translate_errors()
 def api_generate_rebalance(portfolio_id: int, data: RebalanceModel):
-    try:
-        return generate_rebalance_orders(
-            portfolio_id=portfolio_id,
-            account_id=data.account_id,
-            min_deviation=data.min_deviation,
-            fee_rate=data.fee_rate,
-            lot_size=data.lot_size,
-            capital_adjustment=data.capital_adjustment,
-            batch_title=data.title,
-            persist=data.persist,
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return generate_rebalance_orders(
+        portfolio_id=portfolio_id,
+        account_id=data.account_id,
+        min_deviation=data.min_deviation,
+        fee_rate=data.fee_rate,
+        lot_size=data.lot_size,
+        capital_adjustment=data.capital_adjustment,
+        batch_title=data.title,
+        persist=data.persist,
+    )
 
 
 @router.get("/strategy/portfolios/{portfolio_id}/rebalance-orders")
+@_translate_errors(None)
 def api_list_rebalance_orders(
     portfolio_id: int,
     account_id: int = Query(..., ge=1),
     status: Optional[str] = Query(None),
     batch_id: Optional[int] = Query(None, ge=1),
 ):
-    try:
-        return {
-            "orders": list_rebalance_orders(
-                portfolio_id=portfolio_id,
-                account_id=account_id,
-                status=status,
-                batch_id=batch_id,
-            )
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "orders": list_rebalance_orders(
+            portfolio_id=portfolio_id,
+            account_id=account_id,
+            status=status,
+            batch_id=batch_id,
+        )
+    }
 
 
 @router.post("/strategy/rebalance-orders/{order_id}/status")
+@_translate_errors()
 def api_update_order_status(order_id: int, data: OrderStatusModel):
-    try:
-        return update_rebalance_order_status(order_id, data.status)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return update_rebalance_order_status(order_id, data.status)
 
 
 @router.post("/strategy/rebalance-orders/{order_id}/execute")
+@_translate_errors()
 def api_execute_order(order_id: int, data: ExecuteOrderModel):
-    try:
-        return execute_rebalance_order(
-            order_id=order_id,
-            executed_shares=data.executed_shares,
-            executed_price=data.executed_price,
-            note=data.note,
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return execute_rebalance_order(
+        order_id=order_id,
+        executed_shares=data.executed_shares,
+        executed_price=data.executed_price,
+        note=data.note,
+    )
 
 
 @router.post("/strategy/rebalance-orders/{order_id}/apply")
+@_translate_errors()
 def api_apply_order(order_id: int, data: ExecuteOrderModel):
-    try:
-        return execute_rebalance_order(
-            order_id=order_id,
-            executed_shares=data.executed_shares,
-            executed_price=data.executed_price,
-            note=data.note,
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return execute_rebalance_order(
+        order_id=order_id,
+        executed_shares=data.executed_shares,
+        executed_price=data.executed_price,
+        note=data.note,
+    )
 
 
 @router.get("/strategy/portfolios/{portfolio_id}/rebalance-batches")
+@_translate_errors(None)
 def api_list_rebalance_batches(portfolio_id: int, account_id: int = Query(..., ge=1)):
-    try:
-        return {"batches": list_rebalance_batches(portfolio_id, account_id)}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {"batches": list_rebalance_batches(portfolio_id, account_id)}
 
 
 @router.post("/strategy/rebalance-batches/{batch_id}/complete")
+@_translate_errors()
 def api_complete_rebalance_batch(batch_id: int):
-    try:
-        return complete_rebalance_batch(batch_id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return complete_rebalance_batch(batch_id)
 
 
 @router.post("/strategy/rebalance-batches/{batch_id}/refresh")
+@_translate_errors()
 def api_refresh_rebalance_batch(batch_id: int):
-    try:
-        return refresh_rebalance_batch(batch_id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return refresh_rebalance_batch(batch_id)
 
 
 @router.patch("/strategy/rebalance-batches/{batch_id}/refresh")
+@_translate_errors()
 def api_refresh_rebalance_batch_patch(batch_id: int):
-    try:
-        return refresh_rebalance_batch(batch_id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return refresh_rebalance_batch(batch_id)
 
 
 @router.post("/strategy/rebalance-batches/{batch_id}/recalc")
+@_translate_errors()
 def api_refresh_rebalance_batch_recalc(batch_id: int):
-    try:
-        return refresh_rebalance_batch(batch_id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return refresh_rebalance_batch(batch_id)
@@ -2,7 +2,7 @@ from typing import List, Dict, Any
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from ..db import get_db_connection
+from ..db import get_db_connection, get_write_connection
 from .fund import get_combined_valuation, get_fund_type
 
 logger = logging.getLogger(__name__)
@@ -227,10 +227,12 @@ def get_all_positions(account_id: int = 1) -> Dict[str, Any]:
         "positions": sorted(positions, key=lambda x: x["est_market_value"], reverse=True)
     }
 
-def upsert_position(account_id: int, code: str, cost: float, shares: float):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
+def upsert_position(account_id: int, code: str, cost: float, shares: float, conn=None):
+    """Pass `conn` to write inside a caller's get_write_connection() block."""
+    if conn is None:
+        with get_write_connection() as conn:
+            return upsert_position(account_id, code, cost, shares, conn)
+    conn.execute("""
         INSERT INTO positions (account_id, code, cost, shares)
         VALUES (?, ?, ?, ?)
         ON CONFLICT(account_id, code) DO UPDATE SET
@@ -238,12 +240,10 @@ def upsert_position(account_id: int, code: str, cost: float, shares: float):
             shares = excluded.shares,
             updated_at = CURRENT_TIMESTAMP
     """, (account_id, code, cost, shares))
-    conn.commit()
-    conn.close()
 
-def remove_position(account_id: int, code: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM positions WHERE account_id = ? AND code = ?", (account_id, code))
-    conn.commit()
-    conn.close()
+def remove_position(account_id: int, code: str, conn=None):
+    """Pass `conn` to write inside a caller's get_write_connection() block."""
+    if conn is None:
+        with get_write_connection() as conn:
+            return remove_position(account_id, code, conn)
+    conn.execute("DELETE FROM positions WHERE account_id = ? AND code = ?", (account_id, code))
@@ -1,17 +1,128 @@
+import asyncio
 import os
 import re
 import datetime
-import json
+import string
+import threading
+import functools
+import hashlib
+import importlib.util
+import itertools
+import time
 import numpy as np
 import pandas as pd
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from duckduckgo_search import DDGS
-import requests
+import httpx
+import orjson
 
 from ..config import Config
 from .fund import get_fund_history, _calculate_technical_indicators
 from ..db import get_db_connection
 
+# Shared async LLM client: keep-alive connections to api_base survive across
+# calls and the event loop is free while a completion is in flight.
+# HTTP/2 needs the optional h2 package; without it the client speaks HTTP/1.1.
+# trust_env=False avoids local SOCKS proxy env and eliminates socksio dependency issues.
+_HTTPX = httpx.AsyncClient(
+    transport=httpx.AsyncHTTPTransport(
+        http2=importlib.util.find_spec("h2") is not None,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+    ),
+    trust_env=False,
+    timeout=httpx.Timeout(90.0),
+)
+
+
+async def aclose_http_client():
+    await _HTTPX.aclose()
+
+
+# prompt_id (None = default template) -> (fetched_at, system_prompt, user_prompt)
+_PROMPT_CACHE: Dict[Optional[int], Tuple[float, str, str]] = {}
+_PROMPT_TTL = 60
+
+# blake2b of the summary inputs -> (built_at, rendered backtest summary)
+_SUMMARY_CACHE: Dict[str, Tuple[float, str]] = {}
+_SUMMARY_TTL = 10 * 60
+
+
+@functools.lru_cache(maxsize=8)
+def _auth_headers(api_key: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+# First fenced block in an LLM reply, optionally tagged json; an unclosed fence runs to the end.
+_JSON_FENCE = re.compile(r"```(?:json)?\s*([\s\S]*?)(?:```|$)")
+
+
+def _extract_json(raw: str) -> str:
+    m = _JSON_FENCE.search(raw)
+    return (m.group(1) if m else raw).strip()
+
+
+# One DDGS client (and its HTTP session) shared by all news searches, created on first use.
+_DDGS_CLIENT: Optional[DDGS] = None
+_DDGS_LOCK = threading.Lock()
+
+
+def _get_ddgs() -> DDGS:
+    global _DDGS_CLIENT
+    with _DDGS_LOCK:
+        if _DDGS_CLIENT is None:
+            _DDGS_CLIENT = DDGS(verify=False)
+        return _DDGS_CLIENT
+
+
+def _navs_from_history(history: List[Dict[str, Any]], limit: int) -> np.ndarray:
+    """NAVs of the first `limit` history rows, read without slicing the list."""
+    n = min(limit, len(history))
+    return np.fromiter((h["nav"] for h in itertools.islice(history, n)), dtype=np.float64, count=n)
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_template(tpl: str) -> Optional[tuple]:
+    """
+    Parse a str.format template once into literal strings interleaved with
+    (name, conversion, format_spec) fields. Returns None for templates that use
+    attribute/index lookups or nested specs; those are left to str.format.
+    """
+    compiled = []
+    for literal, name, spec, conversion in string.Formatter().parse(tpl):
+        if literal:
+            compiled.append(literal)
+        if name is None:
+            continue
+        if not name.isidentifier() or "{" in (spec or ""):
+            return None
+        compiled.append((name, conversion, spec or ""))
+    return tuple(compiled)
+
+
+def _render_template(tpl: str, variables: Dict[str, Any]) -> str:
+    """Same result as tpl.format(**variables), minus re-parsing tpl every call."""
+    compiled = _compile_template(tpl)
+    if compiled is None:
+        return tpl.format(**variables)
+    parts = []
+    for piece in compiled:
+        if isinstance(piece, str):
+            parts.append(piece)
+            continue
+        name, conversion, spec = piece
+        value = variables[name]
+        if conversion == "r":
+            value = repr(value)
+        elif conversion == "s":
+            value = str(value)
+        elif conversion == "a":
+            value = ascii(value)
+        parts.append(format(value, spec))
+    return "".join(parts)
 
 class AIService:
     _FALLBACK_SYSTEM_PROMPT = (
@@ -75,29 +186,38 @@ class AIService:
         """
         Get prompt template from database.
         If prompt_id is None, use the default template.
+        Results are cached for _PROMPT_TTL seconds; prompt writes invalidate the cache.
         """
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        key = prompt_id or None
+        cached = _PROMPT_CACHE.get(key)
+        if cached and time.monotonic() - cached[0] < _PROMPT_TTL:
+            return cached[1], cached[2]
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            if key:
+                cursor.execute("""
+                    SELECT system_prompt, user_prompt FROM ai_prompts WHERE id = ?
+                """, (key,))
+            else:
+                cursor.execute("""
+                    SELECT system_prompt, user_prompt FROM ai_prompts WHERE is_default = 1 LIMIT 1
+                """)
+            row = cursor.fetchone()
 
-        if prompt_id:
-            cursor.execute("""
-                SELECT system_prompt, user_prompt FROM ai_prompts WHERE id = ?
-            """, (prompt_id,))
+        if row:
+            texts = row["system_prompt"], row["user_prompt"]
         else:
-            cursor.execute("""
-                SELECT system_prompt, user_prompt FROM ai_prompts WHERE is_default = 1 LIMIT 1
-            """)
+            # Fallback to built-in prompt text
+            texts = self._FALLBACK_SYSTEM_PROMPT, self._FALLBACK_USER_PROMPT
 
-        row = cursor.fetchone()
-        conn.close()
+        _PROMPT_CACHE[key] = (time.monotonic(), *texts)
+        return texts
 
-        if row:
-            return row["system_prompt"], row["user_prompt"]
-
-        # Fallback to built-in prompt text
-        return self._FALLBACK_SYSTEM_PROMPT, self._FALLBACK_USER_PROMPT
+    def invalidate_prompt_cache(self):
+        _PROMPT_CACHE.clear()
 
-    def _call_chat_completions(self, system_prompt: str, user_prompt: str, timeout_sec: int = 90) -> str:
+    async def _call_chat_completions_async(self, system_prompt: str, user_prompt: str, timeout_sec: int = 90) -> str:
         api_base = str(Config.OPENAI_API_BASE or "").strip().rstrip("/")
         api_key = str(Config.OPENAI_API_KEY or "").strip()
         model = str(Config.AI_MODEL_NAME or "").strip() or "gpt-3.5-turbo"
@@ -117,28 +237,19 @@ class AIService:
             "max_tokens": 1200,
             "response_format": {"type": "json_object"},
         }
-        # trust_env=False avoids local SOCKS proxy env and eliminates socksio dependency issues.
-        with requests.Session() as s:
-            s.trust_env = False
-            resp = s.post(
-                url,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-                timeout=timeout_sec,
-            )
+        resp = await _HTTPX.post(
+            url,
+            headers=_auth_headers(api_key),
+            content=orjson.dumps(payload),
+            timeout=timeout_sec,
+        )
         if resp.status_code >= 400:
             raise ValueError(f"LLM 接口失败: HTTP {resp.status_code} {resp.text[:200]}")
-        body = resp.json()
+        body = orjson.loads(resp.content)
         return str(body["choices"][0]["message"]["content"] or "")
 
     def get_backtest_prompt_presets(self) -> List[Dict[str, Any]]:
-        presets = []
-        for key, item in self._BACKTEST_PRESET_PROMPTS.items():
-            presets.append({"key": key, "name": item.get("name", key)})
-        return presets
+        return _BACKTEST_PRESET_LIST
 
     def _build_backtest_summary(self, backtest_result: Dict[str, Any]) -> str:
         params = backtest_result.get("params") or {}
@@ -180,11 +291,37 @@ class AIService:
             f"- 末笔交易: {last_trade}\n"
         )
 
+    def _cached_backtest_summary(self, backtest_result: Dict[str, Any]) -> str:
+        """
+        _build_backtest_summary keyed by a hash of the fields it reads, so
+        re-analyzing one backtest in another style reuses the rendered text.
+        """
+        trades = backtest_result.get("trades") or []
+        key_src = {
+            "params": backtest_result.get("params"),
+            "capital": backtest_result.get("capital"),
+            "metrics": backtest_result.get("metrics"),
+            "period_returns": backtest_result.get("period_returns"),
+            "rebalance_summary": backtest_result.get("rebalance_summary"),
+            "trades": [trades[0], trades[-1]] if trades else [],
+        }
+        key = hashlib.blake2b(orjson.dumps(key_src, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+        now = time.monotonic()
+        cached = _SUMMARY_CACHE.get(key)
+        if cached and now - cached[0] < _SUMMARY_TTL:
+            return cached[1]
+
+        for stale in [k for k, (ts, _) in _SUMMARY_CACHE.items() if now - ts >= _SUMMARY_TTL]:
+            _SUMMARY_CACHE.pop(stale, None)
+        summary = self._build_backtest_summary(backtest_result)
+        _SUMMARY_CACHE[key] = (now, summary)
+        return summary
+
     def search_news(self, query: str) -> str:
         try:
             # Simple wrapper to fetch news
-            ddgs = DDGS(verify=False)
-            results = ddgs.text(
+            results = _get_ddgs().text(
                 keywords=query,
                 region="cn-zh",
                 safesearch="off",
@@ -195,26 +332,25 @@ class AIService:
             if not results:
                 return "暂无相关近期新闻。"
             
-            output = ""
-            for i, res in enumerate(results, 1):
-                output += f"{i}. {res.get('title')} - {res.get('body')}\n"
-            return output
+            return "".join(
+                f"{i}. {res.get('title')} - {res.get('body')}\n"
+                for i, res in enumerate(results, 1)
+            )
         except Exception as e:
             print(f"Search error: {e}")
             return "新闻搜索服务暂时不可用。"
 
-    def _calculate_indicators(self, history: List[Dict[str, Any]]) -> Dict[str, str]:
+    def _calculate_indicators(self, navs: np.ndarray) -> Dict[str, str]:
         """
         Calculate simple technical indicators based on recent history.
         """
-        if not history or len(history) < 5:
+        if navs.size < 5:
             return {"status": "数据不足", "desc": "新基金或数据缺失"}
 
-        navs = [item['nav'] for item in history]
-        current_nav = navs[-1]
-        max_nav = max(navs)
-        min_nav = min(navs)
-        avg_nav = sum(navs) / len(navs)
+        current_nav = float(navs[-1])
+        max_nav = float(navs.max())
+        min_nav = float(navs.min())
+        avg_nav = float(navs.mean())
 
         # Position in range
         position = (current_nav - min_nav) / (max_nav - min_nav) if max_nav > min_nav else 0.5
@@ -231,62 +367,37 @@ class AIService:
         }
 
     async def analyze_fund(self, fund_info: Dict[str, Any], prompt_id: Optional[int] = None) -> Dict[str, Any]:
+        ts = datetime.datetime.now().strftime("%H:%M:%S")
         if not Config.OPENAI_API_KEY:
             return {
                 "summary": "未配置 LLM API Key，无法进行分析。",
                 "risk_level": "未知",
                 "analysis_report": "请在设置页面配置 OpenAI API Key 以启用 AI 分析功能。",
-                "timestamp": datetime.datetime.now().strftime("%H:%M:%S")
+                "timestamp": ts
             }
 
         fund_id = fund_info.get("id")
         fund_name = fund_info.get("name", "未知基金")
 
         # 1. Gather Data
-        # History (Last 250 days for technical indicators)
-        history = get_fund_history(fund_id, limit=250)
-        indicators = self._calculate_indicators(history[:30] if len(history) >= 30 else history)
+        # History (Last 250 days for technical indicators); a cache miss means a
+        # SQLite read plus upstream HTTP, so keep it off the event loop
+        history = await asyncio.to_thread(get_fund_history, fund_id, limit=250)
+        recent_navs = _navs_from_history(history, 30)
+        indicators = self._calculate_indicators(recent_navs)
 
         # Calculate technical indicators (Sharpe, Volatility, Max Drawdown)
         technical_indicators = _calculate_technical_indicators(history)
 
-        # 1.5 Data Consistency Check
-        consistency_note = ""
-        try:
-            sharpe = technical_indicators.get("sharpe")
-            annual_return_str = technical_indicators.get("annual_return", "")
-            volatility_str = technical_indicators.get("volatility", "")
-
-            if sharpe != "--" and annual_return_str != "--" and volatility_str != "--":
-                # Parse percentage strings
-                annual_return = float(annual_return_str.rstrip('%')) / 100.0
-                volatility = float(volatility_str.rstrip('%')) / 100.0
-                sharpe_val = float(sharpe)
-
-                # Expected Sharpe = (annual_return - rf) / volatility
-                rf = 0.02
-                expected_sharpe = (annual_return - rf) / volatility if volatility > 0 else 0
-                sharpe_diff = abs(expected_sharpe - sharpe_val)
-
-                if sharpe_diff > 0.3:
-                    consistency_note = f"\n⚠️ 数据一致性警告：夏普比率 {sharpe_val} 与计算值 {expected_sharpe:.2f} 偏差 {sharpe_diff:.2f}，可能存在数据异常。"
-                else:
-                    consistency_note = f"\n✓ 数据自洽性验证通过：夏普比率与年化回报/波动率数学一致（偏差 {sharpe_diff:.2f}）。"
-        except:
-            pass
-
         history_summary = "暂无历史数据"
         if history:
-            recent_history = history[:30]
-            history_summary = f"近30日走势: 起始{recent_history[0]['nav']} -> 结束{recent_history[-1]['nav']}. {indicators['desc']}"
+            history_summary = f"近30日走势: 起始{recent_navs[0]} -> 结束{recent_navs[-1]}. {indicators['desc']}"
 
         # Prepare variables for template replacement
-        holdings_str = ""
-        if fund_info.get("holdings"):
-            holdings_str = "\n".join([
-                f"- {h['name']}: {h['percent']}% (涨跌: {h['change']:+.2f}%)"
-                for h in fund_info["holdings"][:10]
-            ])
+        holdings_str = "\n".join(
+            f"- {h['name']}: {h['percent']}% (涨跌: {h['change']:+.2f}%)"
+            for h in itertools.islice(fund_info.get("holdings") or (), 10)
+        )
 
         variables = {
             "fund_code": fund_id,
@@ -306,9 +417,9 @@ class AIService:
         }
 
         # 2. Build prompt text
-        system_prompt, user_template = self._get_prompt_texts(prompt_id)
+        system_prompt, user_template = await asyncio.to_thread(self._get_prompt_texts, prompt_id)
         try:
-            user_prompt = user_template.format(**variables)
+            user_prompt = _render_template(user_template, variables)
         except Exception:
             user_prompt = (
                 f"基金信息: {fund_name}({fund_id})\n"
@@ -319,20 +430,16 @@ class AIService:
 
         try:
             # 3. Invoke LLM through direct HTTP to avoid proxy/socks runtime issues.
-            raw_result = self._call_chat_completions(system_prompt, user_prompt, timeout_sec=90)
+            raw_result = await self._call_chat_completions_async(system_prompt, user_prompt, timeout_sec=90)
 
             # 4. Parse Result
-            clean_json = raw_result.strip()
-            if "```json" in clean_json:
-                clean_json = clean_json.split("```json")[1].split("```")[0]
-            elif "```" in clean_json:
-                clean_json = clean_json.split("```")[1].split("```")[0]
+            clean_json = _extract_json(raw_result)
 
-            result = json.loads(clean_json)
+            result = orjson.loads(clean_json)
 
             # Enrich with indicators for frontend display
             result["indicators"] = indicators
-            result["timestamp"] = datetime.datetime.now().strftime("%H:%M:%S")
+            result["timestamp"] = ts
 
             return result
 
@@ -343,10 +450,11 @@ class AIService:
                 "risk_level": "未知",
                 "analysis_report": f"LLM 调用或解析失败: {str(e)}",
                 "indicators": indicators,
-                "timestamp": datetime.datetime.now().strftime("%H:%M:%S")
+                "timestamp": ts
             }
 
     async def analyze_backtest(self, backtest_result: Dict[str, Any], style: str = "hardcore_audit") -> Dict[str, Any]:
+        ts = datetime.datetime.now().strftime("%H:%M:%S")
         if not Config.OPENAI_API_KEY:
             return {
                 "summary": "未配置 LLM API Key，无法进行分析。",
@@ -356,22 +464,18 @@ class AIService:
                 "risks": [],
                 "actions": [],
                 "style": style,
-                "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
+                "timestamp": ts,
             }
 
         preset = self._BACKTEST_PRESET_PROMPTS.get(style) or self._BACKTEST_PRESET_PROMPTS["hardcore_audit"]
-        summary = self._build_backtest_summary(backtest_result or {})
+        summary = self._cached_backtest_summary(backtest_result or {})
         system_prompt = preset["system"]
         user_prompt = preset["user"].format(backtest_summary=summary)
 
         try:
-            raw_result = self._call_chat_completions(system_prompt, user_prompt, timeout_sec=90)
-            clean_json = raw_result.strip()
-            if "```json" in clean_json:
-                clean_json = clean_json.split("```json")[1].split("```")[0]
-            elif "```" in clean_json:
-                clean_json = clean_json.split("```")[1].split("```")[0]
-            result = json.loads(clean_json)
+            raw_result = await self._call_chat_completions_async(system_prompt, user_prompt, timeout_sec=90)
+            clean_json = _extract_json(raw_result)
+            result = orjson.loads(clean_json)
             result.setdefault("summary", "分析完成")
             result.setdefault("risk_level", "中")
             result.setdefault("analysis_report", "")
@@ -380,7 +484,7 @@ class AIService:
             result.setdefault("actions", [])
             result["style"] = style
             result["style_name"] = preset.get("name", style)
-            result["timestamp"] = datetime.datetime.now().strftime("%H:%M:%S")
+            result["timestamp"] = ts
             return result
         except Exception as e:
             return {
@@ -392,7 +496,13 @@ class AIService:
                 "actions": [],
                 "style": style,
                 "style_name": preset.get("name", style),
-                "timestamp": datetime.datetime.now().strftime("%H:%M:%S"),
+                "timestamp": ts,
             }
 
+# Preset menu for the frontend; built once since the presets are class constants.
+_BACKTEST_PRESET_LIST = [
+    {"key": key, "name": item.get("name", key)}
+    for key, item in AIService._BACKTEST_PRESET_PROMPTS.items()
+]
+
 ai_service = AIService()
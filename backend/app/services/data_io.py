@@ -1,7 +1,10 @@
 import datetime
+import functools
 import logging
-from typing import List, Dict, Any, Optional
-from ..db import get_db_connection
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from ..config import Config
+from ..db import data_version, get_read_connection, get_write_connection
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +14,12 @@ IMPORT_ORDER = ["settings", "ai_prompts", "accounts", "positions", "transactions
 # Sensitive fields that should be masked on export
 SENSITIVE_MASK = "***"
 
+# Recent export payloads: (db path, modules) -> (data_version, metadata, modules).
+# Any commit changes data_version, so a hit is exactly what a fresh read gives.
+_EXPORT_CACHE: Dict[Tuple[str, Tuple[str, ...]], Tuple[int, Dict[str, Any], Dict[str, Any]]] = {}
+_EXPORT_CACHE_SIZE = 4
+_export_cache_lock = threading.Lock()
+
 
 def export_data(modules: List[str]) -> Dict[str, Any]:
     """
@@ -32,29 +41,42 @@ def export_data(modules: List[str]) -> Dict[str, Any]:
         "modules": {}
     }
 
-    # Export each module
-    for module in modules:
-        if module == "settings":
-            result["modules"]["settings"] = _export_settings()
-            result["metadata"]["total_settings"] = len(result["modules"]["settings"])
-        elif module == "ai_prompts":
-            result["modules"]["ai_prompts"] = _export_ai_prompts()
-            result["metadata"]["total_ai_prompts"] = len(result["modules"]["ai_prompts"])
-        elif module == "accounts":
-            result["modules"]["accounts"] = _export_accounts()
-            result["metadata"]["total_accounts"] = len(result["modules"]["accounts"])
-        elif module == "positions":
-            result["modules"]["positions"] = _export_positions()
-            result["metadata"]["total_positions"] = len(result["modules"]["positions"])
-        elif module == "transactions":
-            result["modules"]["transactions"] = _export_transactions()
-            result["metadata"]["total_transactions"] = len(result["modules"]["transactions"])
-        elif module == "subscriptions":
-            result["modules"]["subscriptions"] = _export_subscriptions()
-            result["metadata"]["total_subscriptions"] = len(result["modules"]["subscriptions"])
-        elif module == "strategy":
-            result["modules"]["strategy"] = _export_strategy()
-            result["metadata"]["total_strategy_portfolios"] = len(result["modules"]["strategy"].get("portfolios", []))
+    # Unknown modules are skipped; with none left there is nothing to read
+    selected = [m for m in modules if m in _EXPORTERS]
+    if not selected:
+        return result
+
+    # Unchanged database: reuse the payload. It is shared between calls, so
+    # callers serialize it and must not modify it.
+    cache_key = (Config.DB_PATH, tuple(selected))
+    version = data_version()
+    with _export_cache_lock:
+        cached = _EXPORT_CACHE.get(cache_key)
+    if cached and cached[0] == version:
+        result["metadata"] = dict(cached[1])
+        result["modules"] = dict(cached[2])
+        return result
+
+    with get_read_connection() as conn:
+        # One read transaction: a single shared lock, and every module
+        # (including the six strategy tables) comes from the same snapshot
+        conn.execute("BEGIN DEFERRED")
+        for module in selected:
+            exported = _EXPORTERS[module](conn)
+            result["modules"][module] = exported
+            if module == "strategy":
+                result["metadata"]["total_strategy_portfolios"] = len(exported.get("portfolios", []))
+            else:
+                result["metadata"][f"total_{module}"] = len(exported)
+        conn.commit()
+
+    # version was read before the snapshot, so a write in between only makes
+    # the next call rebuild, never serve stale data
+    with _export_cache_lock:
+        _EXPORT_CACHE.pop(cache_key, None)
+        while len(_EXPORT_CACHE) >= _EXPORT_CACHE_SIZE:
+            _EXPORT_CACHE.pop(next(iter(_EXPORT_CACHE)))
+        _EXPORT_CACHE[cache_key] = (version, dict(result["metadata"]), dict(result["modules"]))
 
     return result
 
@@ -88,38 +110,35 @@ def import_data(data: Dict[str, Any], modules: List[str], mode: str) -> Dict[str
         "details": {}
     }
 
-    conn = get_db_connection()
-    try:
-        # Import modules in dependency order
-        ordered_modules = [m for m in IMPORT_ORDER if m in modules]
-
+    # Import modules in dependency order, skipping ones absent or empty in the data
+    selected = set(modules)
+    module_payloads = data.get("modules", {})
+    ordered_modules = [m for m in IMPORT_ORDER if m in selected and module_payloads.get(m)]
+    if not ordered_modules:
+        return result
+
+    # One BEGIN IMMEDIATE transaction on the writer: the merge-mode pre-scans
+    # and the inserts see the same data, and the whole import is one commit.
+    # Each module runs under its own savepoint, so a module that raises is
+    # rolled back on its own while the others still commit.
+    with get_write_connection() as conn:
         for module in ordered_modules:
-            if module not in data.get("modules", {}):
-                continue
-
-            module_data = data["modules"][module]
-
-            # Skip empty modules
-            if not module_data:
-                continue
+            module_data = module_payloads[module]
+            savepoint = f"import_{module}"
 
             # Import module
-            if module == "settings":
-                module_result = _import_settings(conn, module_data, mode)
-            elif module == "ai_prompts":
-                module_result = _import_ai_prompts(conn, module_data, mode)
-            elif module == "accounts":
-                module_result = _import_accounts(conn, module_data, mode)
-            elif module == "positions":
-                module_result = _import_positions(conn, module_data, mode)
-            elif module == "transactions":
-                module_result = _import_transactions(conn, module_data, mode)
-            elif module == "subscriptions":
-                module_result = _import_subscriptions(conn, module_data, mode)
-            elif module == "strategy":
-                module_result = _import_strategy(conn, module_data, mode)
-            else:
-                continue
+            conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                module_result = _IMPORTERS[module](conn, module_data, mode)
+            except Exception as e:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                total = sum(map(len, module_data.values())) if module == "strategy" else len(module_data)
+                module_result = {
+                    "total": total, "imported": 0, "skipped": 0, "failed": total, "deleted": 0,
+                    "errors": [f"{module} import failed: {e}"],
+                }
+                result["success"] = False
+            conn.execute(f"RELEASE {savepoint}")
 
             # Aggregate results
             result["details"][module] = module_result
@@ -129,267 +148,163 @@ def import_data(data: Dict[str, Any], modules: List[str], mode: str) -> Dict[str
             result["failed"] += module_result.get("failed", 0)
             result["deleted"] += module_result.get("deleted", 0)
 
-        conn.commit()
-
-    except Exception as e:
-        conn.rollback()
-        result["success"] = False
-        result["error"] = str(e)
-        logger.error(f"Import failed: {e}")
-        raise
-    finally:
-        conn.close()
+            # One log line per module rather than one per failed row
+            if module_result.get("failed"):
+                logger.error(
+                    "Import %s: %d rows failed; first errors: %s",
+                    module, module_result["failed"], module_result["errors"][:5],
+                )
 
     return result
 
 
 # Export functions
 
-def _export_settings() -> Dict[str, str]:
+def _export_rows(conn, sql: str) -> List[Dict[str, Any]]:
+    """Run an export SELECT and return its rows as plain dicts keyed by column name."""
+    cursor = conn.cursor()
+    # Plain tuples + zip() build the dicts in C, far cheaper than per-key sqlite3.Row lookups
+    cursor.row_factory = None
+    cursor.execute(sql)
+    columns = tuple(d[0] for d in cursor.description)
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+def _export_settings(conn) -> Dict[str, str]:
     """Export settings (mask sensitive fields)"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT key, value, encrypted FROM settings")
-
-        settings = {}
-        for row in cursor.fetchall():
-            key = row["key"]
-            value = row["value"]
-            encrypted = row["encrypted"]
-
-            # Mask sensitive fields
-            if encrypted:
-                settings[key] = SENSITIVE_MASK
-            else:
-                settings[key] = value
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute("SELECT key, value, encrypted FROM settings")
 
-        return settings
-    finally:
-        conn.close()
+    # Mask sensitive fields
+    return {key: SENSITIVE_MASK if encrypted else value for key, value, encrypted in cursor}
 
 
-def _export_ai_prompts() -> List[Dict[str, Any]]:
+def _export_ai_prompts(conn) -> List[Dict[str, Any]]:
     """Export AI prompts"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT name, system_prompt, user_prompt, is_default, created_at, updated_at
-            FROM ai_prompts
-            ORDER BY id
-        """)
-
-        prompts = []
-        for row in cursor.fetchall():
-            prompts.append({
-                "name": row["name"],
-                "system_prompt": row["system_prompt"],
-                "user_prompt": row["user_prompt"],
-                "is_default": bool(row["is_default"]),
-                "created_at": row["created_at"],
-                "updated_at": row["updated_at"]
-            })
-
-        return prompts
-    finally:
-        conn.close()
-
-
-def _export_accounts() -> List[Dict[str, Any]]:
+    prompts = _export_rows(conn, """
+        SELECT name, system_prompt, user_prompt, is_default, created_at, updated_at
+        FROM ai_prompts
+        ORDER BY id
+    """)
+    for row in prompts:
+        row["is_default"] = bool(row["is_default"])
+
+    return prompts
+
+
+def _export_accounts(conn) -> List[Dict[str, Any]]:
     """Export accounts"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, name, description, created_at, updated_at
-            FROM accounts
-            ORDER BY id
-        """)
-
-        accounts = []
-        for row in cursor.fetchall():
-            accounts.append({
-                "id": row["id"],
-                "name": row["name"],
-                "description": row["description"],
-                "created_at": row["created_at"],
-                "updated_at": row["updated_at"]
-            })
-
-        return accounts
-    finally:
-        conn.close()
-
-
-def _export_positions() -> List[Dict[str, Any]]:
+    return _export_rows(conn, """
+        SELECT id, name, description, created_at, updated_at
+        FROM accounts
+        ORDER BY id
+    """)
+
+
+def _export_positions(conn) -> List[Dict[str, Any]]:
     """Export positions"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT account_id, code, cost, shares, updated_at
-            FROM positions
-            ORDER BY account_id, code
-        """)
-
-        positions = []
-        for row in cursor.fetchall():
-            positions.append({
-                "account_id": row["account_id"],
-                "code": row["code"],
-                "cost": row["cost"],
-                "shares": row["shares"],
-                "updated_at": row["updated_at"]
-            })
-
-        return positions
-    finally:
-        conn.close()
-
-
-def _export_transactions() -> List[Dict[str, Any]]:
+    return _export_rows(conn, """
+        SELECT account_id, code, cost, shares, updated_at
+        FROM positions
+        ORDER BY account_id, code
+    """)
+
+
+def _export_transactions(conn) -> List[Dict[str, Any]]:
     """Export transactions"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, account_id, code, op_type, amount_cny, shares_redeemed,
-                   confirm_date, confirm_nav, shares_added, cost_after,
-                   created_at, applied_at
-            FROM transactions
-            ORDER BY id
-        """)
-
-        transactions = []
-        for row in cursor.fetchall():
-            transactions.append({
-                "id": row["id"],
-                "account_id": row["account_id"],
-                "code": row["code"],
-                "op_type": row["op_type"],
-                "amount_cny": row["amount_cny"],
-                "shares_redeemed": row["shares_redeemed"],
-                "confirm_date": row["confirm_date"],
-                "confirm_nav": row["confirm_nav"],
-                "shares_added": row["shares_added"],
-                "cost_after": row["cost_after"],
-                "created_at": row["created_at"],
-                "applied_at": row["applied_at"]
-            })
-
-        return transactions
-    finally:
-        conn.close()
-
-
-def _export_subscriptions() -> List[Dict[str, Any]]:
+    return _export_rows(conn, """
+        SELECT id, account_id, code, op_type, amount_cny, shares_redeemed,
+               confirm_date, confirm_nav, shares_added, cost_after,
+               created_at, applied_at
+        FROM transactions
+        ORDER BY id
+    """)
+
+
+def _export_subscriptions(conn) -> List[Dict[str, Any]]:
     """Export subscriptions"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, code, email, threshold_up, threshold_down,
-                   enable_digest, digest_time, enable_volatility,
-                   last_notified_at, last_digest_at, created_at
-            FROM subscriptions
-            ORDER BY id
-        """)
-
-        subscriptions = []
-        for row in cursor.fetchall():
-            subscriptions.append({
-                "id": row["id"],
-                "code": row["code"],
-                "email": row["email"],
-                "threshold_up": row["threshold_up"],
-                "threshold_down": row["threshold_down"],
-                "enable_digest": bool(row["enable_digest"]),
-                "digest_time": row["digest_time"],
-                "enable_volatility": bool(row["enable_volatility"]),
-                "last_notified_at": row["last_notified_at"],
-                "last_digest_at": row["last_digest_at"],
-                "created_at": row["created_at"]
-            })
-
-        return subscriptions
-    finally:
-        conn.close()
-
-
-def _export_strategy() -> Dict[str, Any]:
-    """Export strategy-related data."""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            SELECT id, name, account_id, benchmark, fee_rate, scope_codes, created_at, updated_at
-            FROM strategy_portfolios
-            ORDER BY id
-            """
-        )
-        portfolios = [dict(row) for row in cursor.fetchall()]
-
-        cursor.execute(
-            """
-            SELECT id, portfolio_id, version_no, effective_date, note, is_active, created_at
-            FROM strategy_versions
-            ORDER BY id
-            """
-        )
-        versions = [dict(row) for row in cursor.fetchall()]
-
-        cursor.execute(
-            """
-            SELECT id, version_id, fund_code, target_weight, created_at
-            FROM strategy_holdings
-            ORDER BY id
-            """
-        )
-        holdings = [dict(row) for row in cursor.fetchall()]
-
-        cursor.execute(
-            """
-            SELECT id, portfolio_id, account_id, version_id, source, status, title, note, created_at, completed_at
-            FROM rebalance_batches
-            ORDER BY id
-            """
-        )
-        batches = [dict(row) for row in cursor.fetchall()]
-
-        cursor.execute(
-            """
-            SELECT id, portfolio_id, version_id, account_id, fund_code, fund_name, action,
-                   target_weight, current_weight, target_shares, current_shares, delta_shares,
-                   price, trade_amount, fee, status, created_at, executed_at, executed_price,
-                   executed_shares, executed_amount, execution_note, batch_id
-            FROM rebalance_orders
-            ORDER BY id
-            """
-        )
-        orders = [dict(row) for row in cursor.fetchall()]
-
-        cursor.execute(
-            """
-            SELECT id, portfolio_id, account_id, version_id, query_hash, data_tag, result_json, created_at
-            FROM strategy_backtest_cache
-            ORDER BY id
-            """
-        )
-        backtest_cache = [dict(row) for row in cursor.fetchall()]
-
-        return {
-            "portfolios": portfolios,
-            "versions": versions,
-            "holdings": holdings,
-            "rebalance_batches": batches,
-            "rebalance_orders": orders,
-            "backtest_cache": backtest_cache,
-        }
-    finally:
-        conn.close()
+    subscriptions = _export_rows(conn, """
+        SELECT id, code, email, threshold_up, threshold_down,
+               enable_digest, digest_time, enable_volatility,
+               last_notified_at, last_digest_at, created_at
+        FROM subscriptions
+        ORDER BY id
+    """)
+    for row in subscriptions:
+        row["enable_digest"] = bool(row["enable_digest"])
+        row["enable_volatility"] = bool(row["enable_volatility"])
+
+    return subscriptions
+
+
+def _export_strategy(conn) -> Dict[str, Any]:
+    """Export strategy-related data. Run inside a transaction so the tables agree."""
+    portfolios = _export_rows(
+        conn,
+        """
+        SELECT id, name, account_id, benchmark, fee_rate, scope_codes, created_at, updated_at
+        FROM strategy_portfolios
+        ORDER BY id
+        """,
+    )
+
+    versions = _export_rows(
+        conn,
+        """
+        SELECT id, portfolio_id, version_no, effective_date, note, is_active, created_at
+        FROM strategy_versions
+        ORDER BY id
+        """,
+    )
+
+    holdings = _export_rows(
+        conn,
+        """
+        SELECT id, version_id, fund_code, target_weight, created_at
+        FROM strategy_holdings
+        ORDER BY id
+        """,
+    )
+
+    batches = _export_rows(
+        conn,
+        """
+        SELECT id, portfolio_id, account_id, version_id, source, status, title, note, created_at, completed_at
+        FROM rebalance_batches
+        ORDER BY id
+        """,
+    )
+
+    orders = _export_rows(
+        conn,
+        """
+        SELECT id, portfolio_id, version_id, account_id, fund_code, fund_name, action,
+               target_weight, current_weight, target_shares, current_shares, delta_shares,
+               price, trade_amount, fee, status, created_at, executed_at, executed_price,
+               executed_shares, executed_amount, execution_note, batch_id
+        FROM rebalance_orders
+        ORDER BY id
+        """,
+    )
+
+    backtest_cache = _export_rows(
+        conn,
+        """
+        SELECT id, portfolio_id, account_id, version_id, query_hash, data_tag, result_json, created_at
+        FROM strategy_backtest_cache
+        ORDER BY id
+        """,
+    )
+
+    return {
+        "portfolios": portfolios,
+        "versions": versions,
+        "holdings": holdings,
+        "rebalance_batches": batches,
+        "rebalance_orders": orders,
+        "backtest_cache": backtest_cache,
+    }
 
 
 # Import functions (to be continued in next chunk)
@@ -397,28 +312,95 @@ def _export_strategy() -> Dict[str, Any]:
 
 # Import functions
 
+_SETTING_INSERT = """
+INSERT OR REPLACE INTO settings (key, value)
+VALUES (?, ?)
+"""
+
+_PROMPT_INSERT = """
+INSERT INTO ai_prompts (name, system_prompt, user_prompt, is_default)
+VALUES (?, ?, ?, ?)
+"""
+
+_ACCOUNT_INSERT = """
+INSERT INTO accounts (name, description)
+VALUES (?, ?)
+"""
+
+_POSITION_INSERT = """
+INSERT INTO positions (account_id, code, cost, shares)
+VALUES (?, ?, ?, ?)
+"""
+
+_TRANSACTION_INSERT = """
+INSERT INTO transactions (
+    account_id, code, op_type, amount_cny, shares_redeemed,
+    confirm_date, confirm_nav, shares_added, cost_after, applied_at
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SUBSCRIPTION_INSERT = """
+INSERT INTO subscriptions (
+    code, email, threshold_up, threshold_down,
+    enable_digest, digest_time, enable_volatility
+)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _insert_rows(cursor, sql: str, rows: List[Any], on_error, to_params=None) -> int:
+    """
+    executemany() the pre-validated rows and return how many went in.
+    With to_params, each row is turned into its parameters only as SQLite
+    binds it, so no second list of tuples is built next to the records.
+    If the batch hits a bad row it is rolled back to a savepoint and replayed
+    row by row, so a failing row only costs itself (reported via on_error).
+    """
+    if not rows:
+        return 0
+
+    cursor.execute("SAVEPOINT import_batch")
+    try:
+        cursor.executemany(sql, rows if to_params is None else map(to_params, rows))
+    except Exception:
+        cursor.execute("ROLLBACK TO import_batch")
+        cursor.execute("RELEASE import_batch")
+    else:
+        # Rows SQLite actually wrote, summed over the batch; read it before
+        # RELEASE resets the cursor's rowcount
+        imported = cursor.rowcount
+        cursor.execute("RELEASE import_batch")
+        return imported
+
+    imported = 0
+    for row in rows:
+        try:
+            cursor.execute(sql, row if to_params is None else to_params(row))
+            imported += 1
+        except Exception as e:
+            on_error(row, e)
+    return imported
+
+
 def _import_settings(conn, data: Dict[str, str], mode: str) -> Dict[str, Any]:
     """Import settings (always merge mode, skip *** values)"""
     cursor = conn.cursor()
     result = {"total": len(data), "imported": 0, "skipped": 0, "failed": 0, "deleted": 0, "errors": []}
 
-    # Settings always use merge mode
+    # Settings always use merge mode; skip masked sensitive fields
+    rows = []
     for key, value in data.items():
-        # Skip masked sensitive fields
         if value == SENSITIVE_MASK:
             result["skipped"] += 1
             continue
+        rows.append((key, value))
 
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO settings (key, value)
-                VALUES (?, ?)
-            """, (key, value))
-            result["imported"] += 1
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"Failed to import setting {key}: {str(e)}")
-            logger.error(f"Failed to import setting {key}: {e}")
+    def on_error(row, e):
+        result["failed"] += 1
+        result["errors"].append(f"Failed to import setting {row[0]}: {str(e)}")
+
+    result["imported"] = _insert_rows(cursor, _SETTING_INSERT, rows, on_error)
 
     return result
 
@@ -434,36 +416,36 @@ def _import_ai_prompts(conn, data: List[Dict[str, Any]], mode: str) -> Dict[str,
         deleted_count = cursor.rowcount
         result["deleted"] = deleted_count
 
+    # Merge mode skips names that already exist, including earlier rows of this import
+    existing = set()
+    if mode == "merge":
+        cursor.execute("SELECT name FROM ai_prompts")
+        existing = {row[0] for row in cursor}
+
+    rows = []
     for prompt in data:
-        try:
-            name = prompt.get("name")
-            if not name:
+        name = prompt.get("name")
+        if not name:
+            result["skipped"] += 1
+            result["errors"].append("Missing name field")
+            continue
+        if mode == "merge":
+            if name in existing:
                 result["skipped"] += 1
-                result["errors"].append("Missing name field")
                 continue
+            existing.add(name)
+        rows.append((
+            name,
+            prompt.get("system_prompt", ""),
+            prompt.get("user_prompt", ""),
+            1 if prompt.get("is_default") else 0
+        ))
 
-            # Check if prompt with same name exists (merge mode)
-            if mode == "merge":
-                cursor.execute("SELECT id FROM ai_prompts WHERE name = ?", (name,))
-                if cursor.fetchone():
-                    result["skipped"] += 1
-                    continue
-
-            cursor.execute("""
-                INSERT INTO ai_prompts (name, system_prompt, user_prompt, is_default)
-                VALUES (?, ?, ?, ?)
-            """, (
-                name,
-                prompt.get("system_prompt", ""),
-                prompt.get("user_prompt", ""),
-                1 if prompt.get("is_default") else 0
-            ))
-            result["imported"] += 1
+    def on_error(row, e):
+        result["failed"] += 1
+        result["errors"].append(f"Failed to import prompt {row[0]}: {str(e)}")
 
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"Failed to import prompt {prompt.get('name')}: {str(e)}")
-            logger.error(f"Failed to import prompt: {e}")
+    result["imported"] = _insert_rows(cursor, _PROMPT_INSERT, rows, on_error)
 
     return result
 
@@ -479,31 +461,31 @@ def _import_accounts(conn, data: List[Dict[str, Any]], mode: str) -> Dict[str, A
         deleted_count = cursor.rowcount
         result["deleted"] = deleted_count
 
+    # Merge mode skips names that already exist, including earlier rows of this import
+    existing = set()
+    if mode == "merge":
+        cursor.execute("SELECT name FROM accounts")
+        existing = {row[0] for row in cursor}
+
+    rows = []
     for account in data:
-        try:
-            name = account.get("name")
-            if not name:
+        name = account.get("name")
+        if not name:
+            result["skipped"] += 1
+            result["errors"].append("Missing name field")
+            continue
+        if mode == "merge":
+            if name in existing:
                 result["skipped"] += 1
-                result["errors"].append("Missing name field")
                 continue
+            existing.add(name)
+        rows.append((name, account.get("description", "")))
 
-            # Check if account with same name exists (merge mode)
-            if mode == "merge":
-                cursor.execute("SELECT id FROM accounts WHERE name = ?", (name,))
-                if cursor.fetchone():
-                    result["skipped"] += 1
-                    continue
+    def on_error(row, e):
+        result["failed"] += 1
+        result["errors"].append(f"Failed to import account {row[0]}: {str(e)}")
 
-            cursor.execute("""
-                INSERT INTO accounts (name, description)
-                VALUES (?, ?)
-            """, (name, account.get("description", "")))
-            result["imported"] += 1
-
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"Failed to import account {account.get('name')}: {str(e)}")
-            logger.error(f"Failed to import account: {e}")
+    result["imported"] = _insert_rows(cursor, _ACCOUNT_INSERT, rows, on_error)
 
     return result
 
@@ -519,40 +501,52 @@ def _import_positions(conn, data: List[Dict[str, Any]], mode: str) -> Dict[str,
         deleted_count = cursor.rowcount
         result["deleted"] = deleted_count
 
+    cursor.execute("SELECT id FROM accounts")
+    account_ids = {row[0] for row in cursor}
+
+    # Merge mode skips positions that already exist, including earlier rows of this import
+    existing = set()
+    if mode == "merge":
+        cursor.execute("SELECT account_id, code FROM positions")
+        existing = {(row[0], row[1]) for row in cursor}
+
+    rows = []
     for position in data:
+        account_id = position.get("account_id")
+        code = position.get("code")
+
+        if not account_id or not code:
+            result["skipped"] += 1
+            result["errors"].append("Missing account_id or code field")
+            continue
+
+        # Match the INTEGER column the way SQLite would, so "1" still finds account 1
         try:
-            account_id = position.get("account_id")
-            code = position.get("code")
+            account_id = int(account_id)
+        except (TypeError, ValueError):
+            result["skipped"] += 1
+            result["errors"].append(f"Invalid account_id={account_id}")
+            continue
 
-            if not account_id or not code:
-                result["skipped"] += 1
-                result["errors"].append("Missing account_id or code field")
-                continue
+        # Check if account exists
+        if account_id not in account_ids:
+            result["skipped"] += 1
+            result["errors"].append(f"account_id={account_id} does not exist")
+            continue
 
-            # Check if account exists
-            cursor.execute("SELECT id FROM accounts WHERE id = ?", (account_id,))
-            if not cursor.fetchone():
+        if mode == "merge":
+            if (account_id, code) in existing:
                 result["skipped"] += 1
-                result["errors"].append(f"account_id={account_id} does not exist")
                 continue
+            existing.add((account_id, code))
 
-            # Check if position exists (merge mode)
-            if mode == "merge":
-                cursor.execute("SELECT 1 FROM positions WHERE account_id = ? AND code = ?", (account_id, code))
-                if cursor.fetchone():
-                    result["skipped"] += 1
-                    continue
+        rows.append((account_id, code, position.get("cost", 0.0), position.get("shares", 0.0)))
 
-            cursor.execute("""
-                INSERT INTO positions (account_id, code, cost, shares)
-                VALUES (?, ?, ?, ?)
-            """, (account_id, code, position.get("cost", 0.0), position.get("shares", 0.0)))
-            result["imported"] += 1
+    def on_error(row, e):
+        result["failed"] += 1
+        result["errors"].append(f"Failed to import position: {str(e)}")
 
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"Failed to import position: {str(e)}")
-            logger.error(f"Failed to import position: {e}")
+    result["imported"] = _insert_rows(cursor, _POSITION_INSERT, rows, on_error)
 
     return result
 
@@ -568,47 +562,51 @@ def _import_transactions(conn, data: List[Dict[str, Any]], mode: str) -> Dict[st
         deleted_count = cursor.rowcount
         result["deleted"] = deleted_count
 
+    cursor.execute("SELECT id FROM accounts")
+    account_ids = {row[0] for row in cursor}
+
+    rows = []
     for transaction in data:
-        try:
-            account_id = transaction.get("account_id")
-            code = transaction.get("code")
+        account_id = transaction.get("account_id")
+        code = transaction.get("code")
 
-            if not account_id or not code:
-                result["skipped"] += 1
-                result["errors"].append("Missing account_id or code field")
-                continue
+        if not account_id or not code:
+            result["skipped"] += 1
+            result["errors"].append("Missing account_id or code field")
+            continue
 
-            # Check if account exists
-            cursor.execute("SELECT id FROM accounts WHERE id = ?", (account_id,))
-            if not cursor.fetchone():
-                result["skipped"] += 1
-                result["errors"].append(f"account_id={account_id} does not exist")
-                continue
+        # Match the INTEGER column the way SQLite would, so "1" still finds account 1
+        try:
+            account_id = int(account_id)
+        except (TypeError, ValueError):
+            result["skipped"] += 1
+            result["errors"].append(f"Invalid account_id={account_id}")
+            continue
 
-            cursor.execute("""
-                INSERT INTO transactions (
-                    account_id, code, op_type, amount_cny, shares_redeemed,
-                    confirm_date, confirm_nav, shares_added, cost_after, applied_at
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                account_id,
-                code,
-                transaction.get("op_type"),
-                transaction.get("amount_cny"),
-                transaction.get("shares_redeemed"),
-                transaction.get("confirm_date"),
-                transaction.get("confirm_nav"),
-                transaction.get("shares_added"),
-                transaction.get("cost_after"),
-                transaction.get("applied_at")
-            ))
-            result["imported"] += 1
+        # Check if account exists
+        if account_id not in account_ids:
+            result["skipped"] += 1
+            result["errors"].append(f"account_id={account_id} does not exist")
+            continue
 
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"Failed to import transaction: {str(e)}")
-            logger.error(f"Failed to import transaction: {e}")
+        rows.append((
+            account_id,
+            code,
+            transaction.get("op_type"),
+            transaction.get("amount_cny"),
+            transaction.get("shares_redeemed"),
+            transaction.get("confirm_date"),
+            transaction.get("confirm_nav"),
+            transaction.get("shares_added"),
+            transaction.get("cost_after"),
+            transaction.get("applied_at")
+        ))
+
+    def on_error(row, e):
+        result["failed"] += 1
+        result["errors"].append(f"Failed to import transaction: {str(e)}")
+
+    result["imported"] = _insert_rows(cursor, _TRANSACTION_INSERT, rows, on_error)
 
     return result
 
@@ -624,48 +622,251 @@ def _import_subscriptions(conn, data: List[Dict[str, Any]], mode: str) -> Dict[s
         deleted_count = cursor.rowcount
         result["deleted"] = deleted_count
 
+    # Merge mode skips subscriptions that already exist, including earlier rows of this import
+    existing = set()
+    if mode == "merge":
+        cursor.execute("SELECT code, email FROM subscriptions")
+        existing = {(row[0], row[1]) for row in cursor}
+
+    rows = []
     for subscription in data:
-        try:
-            code = subscription.get("code")
-            email = subscription.get("email")
+        code = subscription.get("code")
+        email = subscription.get("email")
 
-            if not code or not email:
+        if not code or not email:
+            result["skipped"] += 1
+            result["errors"].append("Missing code or email field")
+            continue
+
+        if mode == "merge":
+            if (code, email) in existing:
                 result["skipped"] += 1
-                result["errors"].append("Missing code or email field")
                 continue
+            existing.add((code, email))
 
-            # Check if subscription exists (merge mode)
-            if mode == "merge":
-                cursor.execute("SELECT id FROM subscriptions WHERE code = ? AND email = ?", (code, email))
-                if cursor.fetchone():
-                    result["skipped"] += 1
-                    continue
-
-            cursor.execute("""
-                INSERT INTO subscriptions (
-                    code, email, threshold_up, threshold_down,
-                    enable_digest, digest_time, enable_volatility
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                code,
-                email,
-                subscription.get("threshold_up"),
-                subscription.get("threshold_down"),
-                1 if subscription.get("enable_digest") else 0,
-                subscription.get("digest_time", "14:45"),
-                1 if subscription.get("enable_volatility") else 0
-            ))
-            result["imported"] += 1
+        rows.append((
+            code,
+            email,
+            subscription.get("threshold_up"),
+            subscription.get("threshold_down"),
+            1 if subscription.get("enable_digest") else 0,
+            subscription.get("digest_time", "14:45"),
+            1 if subscription.get("enable_volatility") else 0
+        ))
 
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"Failed to import subscription: {str(e)}")
-            logger.error(f"Failed to import subscription: {e}")
+    def on_error(row, e):
+        result["failed"] += 1
+        result["errors"].append(f"Failed to import subscription: {str(e)}")
+
+    result["imported"] = _insert_rows(cursor, _SUBSCRIPTION_INSERT, rows, on_error)
 
     return result
 
 
+def _last_per_id(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keep only the last record for each id, which is what sequential upserts
+    would leave behind anyway. Rows without an id are plain inserts and all stay.
+    """
+    by_id = {}
+    new_rows = []
+    for row in rows:
+        row_id = row.get("id")
+        if row_id is None:
+            new_rows.append(row)
+        else:
+            by_id[row_id] = row
+    return [*by_id.values(), *new_rows]
+
+
+_PORTFOLIO_UPSERT = """
+INSERT INTO strategy_portfolios (id, name, account_id, benchmark, fee_rate, scope_codes, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  name=excluded.name,
+  account_id=excluded.account_id,
+  benchmark=excluded.benchmark,
+  fee_rate=excluded.fee_rate,
+  scope_codes=excluded.scope_codes,
+  updated_at=excluded.updated_at
+"""
+
+
+def _portfolio_row(p: Dict[str, Any], now: str) -> tuple:
+    return (
+        p.get("id"),
+        p.get("name", ""),
+        p.get("account_id"),
+        p.get("benchmark", "000300"),
+        p.get("fee_rate", 0.001),
+        p.get("scope_codes", "[]"),
+        p.get("created_at") or now,
+        p.get("updated_at") or now,
+    )
+
+
+_VERSION_UPSERT = """
+INSERT INTO strategy_versions (id, portfolio_id, version_no, effective_date, note, is_active, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  portfolio_id=excluded.portfolio_id,
+  version_no=excluded.version_no,
+  effective_date=excluded.effective_date,
+  note=excluded.note,
+  is_active=excluded.is_active
+"""
+
+
+def _version_row(v: Dict[str, Any], now: str) -> tuple:
+    return (
+        v.get("id"),
+        v.get("portfolio_id"),
+        v.get("version_no"),
+        v.get("effective_date"),
+        v.get("note"),
+        v.get("is_active", 1),
+        v.get("created_at") or now,
+    )
+
+
+_HOLDING_UPSERT = """
+INSERT INTO strategy_holdings (id, version_id, fund_code, target_weight, created_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  version_id=excluded.version_id,
+  fund_code=excluded.fund_code,
+  target_weight=excluded.target_weight
+"""
+
+
+def _holding_row(h: Dict[str, Any], now: str) -> tuple:
+    return (
+        h.get("id"),
+        h.get("version_id"),
+        h.get("fund_code"),
+        h.get("target_weight"),
+        h.get("created_at") or now,
+    )
+
+
+_BATCH_UPSERT = """
+INSERT INTO rebalance_batches (id, portfolio_id, account_id, version_id, source, status, title, note, created_at, completed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  portfolio_id=excluded.portfolio_id,
+  account_id=excluded.account_id,
+  version_id=excluded.version_id,
+  source=excluded.source,
+  status=excluded.status,
+  title=excluded.title,
+  note=excluded.note,
+  completed_at=excluded.completed_at
+"""
+
+
+def _batch_row(b: Dict[str, Any], now: str) -> tuple:
+    return (
+        b.get("id"),
+        b.get("portfolio_id"),
+        b.get("account_id"),
+        b.get("version_id"),
+        b.get("source", "auto"),
+        b.get("status", "pending"),
+        b.get("title"),
+        b.get("note"),
+        b.get("created_at") or now,
+        b.get("completed_at"),
+    )
+
+
+_ORDER_UPSERT = """
+INSERT INTO rebalance_orders (
+  id, portfolio_id, version_id, account_id, fund_code, fund_name, action,
+  target_weight, current_weight, target_shares, current_shares, delta_shares,
+  price, trade_amount, fee, status, created_at, executed_at, executed_price,
+  executed_shares, executed_amount, execution_note, batch_id
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  portfolio_id=excluded.portfolio_id,
+  version_id=excluded.version_id,
+  account_id=excluded.account_id,
+  fund_code=excluded.fund_code,
+  fund_name=excluded.fund_name,
+  action=excluded.action,
+  target_weight=excluded.target_weight,
+  current_weight=excluded.current_weight,
+  target_shares=excluded.target_shares,
+  current_shares=excluded.current_shares,
+  delta_shares=excluded.delta_shares,
+  price=excluded.price,
+  trade_amount=excluded.trade_amount,
+  fee=excluded.fee,
+  status=excluded.status,
+  executed_at=excluded.executed_at,
+  executed_price=excluded.executed_price,
+  executed_shares=excluded.executed_shares,
+  executed_amount=excluded.executed_amount,
+  execution_note=excluded.execution_note,
+  batch_id=excluded.batch_id
+"""
+
+
+def _order_row(o: Dict[str, Any], now: str) -> tuple:
+    return (
+        o.get("id"),
+        o.get("portfolio_id"),
+        o.get("version_id"),
+        o.get("account_id"),
+        o.get("fund_code"),
+        o.get("fund_name"),
+        o.get("action"),
+        o.get("target_weight"),
+        o.get("current_weight"),
+        o.get("target_shares"),
+        o.get("current_shares"),
+        o.get("delta_shares"),
+        o.get("price"),
+        o.get("trade_amount"),
+        o.get("fee"),
+        o.get("status", "suggested"),
+        o.get("created_at") or now,
+        o.get("executed_at"),
+        o.get("executed_price"),
+        o.get("executed_shares"),
+        o.get("executed_amount"),
+        o.get("execution_note"),
+        o.get("batch_id"),
+    )
+
+
+# OR REPLACE: a row with another id but the same query key replaces the old one
+_BACKTEST_CACHE_UPSERT = """
+INSERT OR REPLACE INTO strategy_backtest_cache (
+  id, portfolio_id, account_id, version_id, query_hash, data_tag, result_json, created_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  portfolio_id=excluded.portfolio_id,
+  account_id=excluded.account_id,
+  version_id=excluded.version_id,
+  query_hash=excluded.query_hash,
+  data_tag=excluded.data_tag,
+  result_json=excluded.result_json
+"""
+
+
+def _backtest_cache_row(c: Dict[str, Any], now: str) -> tuple:
+    return (
+        c.get("id"),
+        c.get("portfolio_id"),
+        c.get("account_id"),
+        c.get("version_id"),
+        c.get("query_hash"),
+        c.get("data_tag"),
+        c.get("result_json"),
+        c.get("created_at") or now,
+    )
+
+
 def _import_strategy(conn, data: Dict[str, Any], mode: str) -> Dict[str, Any]:
     """Import strategy-related data."""
     cursor = conn.cursor()
@@ -691,228 +892,50 @@ def _import_strategy(conn, data: Dict[str, Any], mode: str) -> Dict[str, Any]:
             cursor.execute(f"DELETE FROM {table}")
             result["deleted"] += int(cursor.rowcount or 0)
 
-    def _upsert_portfolio(p: Dict[str, Any]):
-        cursor.execute(
-            """
-            INSERT INTO strategy_portfolios (id, name, account_id, benchmark, fee_rate, scope_codes, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
-            ON CONFLICT(id) DO UPDATE SET
-              name=excluded.name,
-              account_id=excluded.account_id,
-              benchmark=excluded.benchmark,
-              fee_rate=excluded.fee_rate,
-              scope_codes=excluded.scope_codes,
-              updated_at=excluded.updated_at
-            """,
-            (
-                p.get("id"),
-                p.get("name", ""),
-                p.get("account_id"),
-                p.get("benchmark", "000300"),
-                p.get("fee_rate", 0.001),
-                p.get("scope_codes", "[]"),
-                p.get("created_at"),
-                p.get("updated_at"),
-            ),
-        )
-
-    def _upsert_version(v: Dict[str, Any]):
-        cursor.execute(
-            """
-            INSERT INTO strategy_versions (id, portfolio_id, version_no, effective_date, note, is_active, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
-            ON CONFLICT(id) DO UPDATE SET
-              portfolio_id=excluded.portfolio_id,
-              version_no=excluded.version_no,
-              effective_date=excluded.effective_date,
-              note=excluded.note,
-              is_active=excluded.is_active
-            """,
-            (
-                v.get("id"),
-                v.get("portfolio_id"),
-                v.get("version_no"),
-                v.get("effective_date"),
-                v.get("note"),
-                v.get("is_active", 1),
-                v.get("created_at"),
-            ),
-        )
-
-    def _upsert_holding(h: Dict[str, Any]):
-        cursor.execute(
-            """
-            INSERT INTO strategy_holdings (id, version_id, fund_code, target_weight, created_at)
-            VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
-            ON CONFLICT(id) DO UPDATE SET
-              version_id=excluded.version_id,
-              fund_code=excluded.fund_code,
-              target_weight=excluded.target_weight
-            """,
-            (
-                h.get("id"),
-                h.get("version_id"),
-                h.get("fund_code"),
-                h.get("target_weight"),
-                h.get("created_at"),
-            ),
-        )
-
-    def _upsert_batch(b: Dict[str, Any]):
-        cursor.execute(
-            """
-            INSERT INTO rebalance_batches (id, portfolio_id, account_id, version_id, source, status, title, note, created_at, completed_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
-            ON CONFLICT(id) DO UPDATE SET
-              portfolio_id=excluded.portfolio_id,
-              account_id=excluded.account_id,
-              version_id=excluded.version_id,
-              source=excluded.source,
-              status=excluded.status,
-              title=excluded.title,
-              note=excluded.note,
-              completed_at=excluded.completed_at
-            """,
-            (
-                b.get("id"),
-                b.get("portfolio_id"),
-                b.get("account_id"),
-                b.get("version_id"),
-                b.get("source", "auto"),
-                b.get("status", "pending"),
-                b.get("title"),
-                b.get("note"),
-                b.get("created_at"),
-                b.get("completed_at"),
-            ),
-        )
-
-    def _upsert_order(o: Dict[str, Any]):
-        cursor.execute(
-            """
-            INSERT INTO rebalance_orders (
-              id, portfolio_id, version_id, account_id, fund_code, fund_name, action,
-              target_weight, current_weight, target_shares, current_shares, delta_shares,
-              price, trade_amount, fee, status, created_at, executed_at, executed_price,
-              executed_shares, executed_amount, execution_note, batch_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-              portfolio_id=excluded.portfolio_id,
-              version_id=excluded.version_id,
-              account_id=excluded.account_id,
-              fund_code=excluded.fund_code,
-              fund_name=excluded.fund_name,
-              action=excluded.action,
-              target_weight=excluded.target_weight,
-              current_weight=excluded.current_weight,
-              target_shares=excluded.target_shares,
-              current_shares=excluded.current_shares,
-              delta_shares=excluded.delta_shares,
-              price=excluded.price,
-              trade_amount=excluded.trade_amount,
-              fee=excluded.fee,
-              status=excluded.status,
-              executed_at=excluded.executed_at,
-              executed_price=excluded.executed_price,
-              executed_shares=excluded.executed_shares,
-              executed_amount=excluded.executed_amount,
-              execution_note=excluded.execution_note,
-              batch_id=excluded.batch_id
-            """,
-            (
-                o.get("id"),
-                o.get("portfolio_id"),
-                o.get("version_id"),
-                o.get("account_id"),
-                o.get("fund_code"),
-                o.get("fund_name"),
-                o.get("action"),
-                o.get("target_weight"),
-                o.get("current_weight"),
-                o.get("target_shares"),
-                o.get("current_shares"),
-                o.get("delta_shares"),
-                o.get("price"),
-                o.get("trade_amount"),
-                o.get("fee"),
-                o.get("status", "suggested"),
-                o.get("created_at"),
-                o.get("executed_at"),
-                o.get("executed_price"),
-                o.get("executed_shares"),
-                o.get("executed_amount"),
-                o.get("execution_note"),
-                o.get("batch_id"),
-            ),
-        )
-
-    def _upsert_backtest_cache(c: Dict[str, Any]):
-        cursor.execute(
-            """
-            INSERT INTO strategy_backtest_cache (
-              id, portfolio_id, account_id, version_id, query_hash, data_tag, result_json, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
-            ON CONFLICT(id) DO UPDATE SET
-              portfolio_id=excluded.portfolio_id,
-              account_id=excluded.account_id,
-              version_id=excluded.version_id,
-              query_hash=excluded.query_hash,
-              data_tag=excluded.data_tag,
-              result_json=excluded.result_json
-            """,
-            (
-                c.get("id"),
-                c.get("portfolio_id"),
-                c.get("account_id"),
-                c.get("version_id"),
-                c.get("query_hash"),
-                c.get("data_tag"),
-                c.get("result_json"),
-                c.get("created_at"),
-            ),
-        )
-
-    for row in portfolios:
-        try:
-            _upsert_portfolio(row)
-            result["imported"] += 1
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"strategy_portfolio import failed: {e}")
-    for row in versions:
-        try:
-            _upsert_version(row)
-            result["imported"] += 1
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"strategy_version import failed: {e}")
-    for row in holdings:
-        try:
-            _upsert_holding(row)
-            result["imported"] += 1
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"strategy_holding import failed: {e}")
-    for row in batches:
-        try:
-            _upsert_batch(row)
-            result["imported"] += 1
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"rebalance_batch import failed: {e}")
-    for row in orders:
-        try:
-            _upsert_order(row)
-            result["imported"] += 1
-        except Exception as e:
-            result["failed"] += 1
-            result["errors"].append(f"rebalance_order import failed: {e}")
-    for row in backtest_cache:
-        try:
-            _upsert_backtest_cache(row)
-            result["imported"] += 1
-        except Exception as e:
+    # Missing timestamps get one import-wide value instead of a per-row
+    # CURRENT_TIMESTAMP call inside SQLite (same UTC format)
+    now = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _on_error(label: str):
+        def on_error(row, e):
             result["failed"] += 1
-            result["errors"].append(f"backtest_cache import failed: {e}")
+            result["errors"].append(f"{label} import failed: {e}")
+        return on_error
+
+    # Parents first so the batches below see the rows they reference
+    for rows, sql, row_fn, label in (
+        (portfolios, _PORTFOLIO_UPSERT, _portfolio_row, "strategy_portfolio"),
+        (versions, _VERSION_UPSERT, _version_row, "strategy_version"),
+        (holdings, _HOLDING_UPSERT, _holding_row, "strategy_holding"),
+        (batches, _BATCH_UPSERT, _batch_row, "rebalance_batch"),
+        (orders, _ORDER_UPSERT, _order_row, "rebalance_order"),
+        (backtest_cache, _BACKTEST_CACHE_UPSERT, _backtest_cache_row, "backtest_cache"),
+    ):
+        # Repeated ids would only rewrite the same row; count them as skipped
+        unique_rows = _last_per_id(rows)
+        result["skipped"] += len(rows) - len(unique_rows)
+        result["imported"] += _insert_rows(cursor, sql, unique_rows, _on_error(label), to_params=functools.partial(row_fn, now=now))
 
     return result
+
+
+# Module name -> handler, looked up by export_data / import_data
+_EXPORTERS = {
+    "settings": _export_settings,
+    "ai_prompts": _export_ai_prompts,
+    "accounts": _export_accounts,
+    "positions": _export_positions,
+    "transactions": _export_transactions,
+    "subscriptions": _export_subscriptions,
+    "strategy": _export_strategy,
+}
+
+_IMPORTERS = {
+    "settings": _import_settings,
+    "ai_prompts": _import_ai_prompts,
+    "accounts": _import_accounts,
+    "positions": _import_positions,
+    "transactions": _import_transactions,
+    "subscriptions": _import_subscriptions,
+    "strategy": _import_strategy,
+}
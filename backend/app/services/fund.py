@@ -1,16 +1,97 @@
+import functools
 import time
 import json
 import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 import pandas as pd
 import akshare as ak
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from ..db import get_db_connection
+from ..db import get_db_connection, get_read_connection
 from ..config import Config
 
+# Shared session: quotes hit the same few hosts (sinajs, 1234567, eastmoney)
+# over and over, so keep-alive connections are reused instead of reconnecting
+# on every call.
+_HTTP = requests.Session()
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=1, backoff_factor=0.1),
+)
+_HTTP.mount("http://", _HTTP_ADAPTER)
+_HTTP.mount("https://", _HTTP_ADAPTER)
+
+# Per-source TTLs for the in-process caches (seconds)
+VALUATION_TTL_SECONDS = 15
+PINGZHONG_TTL_SECONDS = 3600
+FUND_INFO_TTL_SECONDS = 86400
+
+
+def _ttl_cache(ttl: float, maxsize: int = 1024):
+    """
+    Memoize a lookup's non-empty results per argument tuple for `ttl` seconds.
+    Empty results (failed fetches) are not cached so the next call retries.
+    Dict results are handed out as shallow copies so callers can't edit the
+    cached value. The wrapper gets a cache_clear() for invalidation.
+    """
+    def decorator(func):
+        cache: Dict[tuple, Tuple[float, Any]] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            cached = cache.get(args)
+            if cached and now - cached[0] < ttl:
+                value = cached[1]
+            else:
+                value = func(*args)
+                if not value:
+                    return value
+                with lock:
+                    if len(cache) >= maxsize:
+                        for stale in [k for k, (ts, _) in cache.items() if now - ts >= ttl]:
+                            del cache[stale]
+                        if len(cache) >= maxsize:
+                            del cache[next(iter(cache))]
+                    cache[args] = (now, value)
+            return dict(value) if isinstance(value, dict) else value
+
+        def cache_clear() -> None:
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+
+# Eastmoney stamps NAV points at Beijing midnight
+_CST_OFFSET = pd.Timedelta(hours=8)
+
+_HK_PREFIX_RE = re.compile(r"^HK\s*0*(\d{4,5})$")
+_HK_SUFFIX_RE = re.compile(r"^0*(\d{4,5})\.HK$")
+_SINA_QUOTE_RE = re.compile(r'="(.*)"')
+_SINA_BATCH_RE = re.compile(r'hq_str_(\w+)="([^"]*)"')
+_JSONPGZ_RE = re.compile(r"jsonpgz\((.*)\)")
+_FS_NAME_RE = re.compile(r'fS_name\s*=\s*"(.*?)";')
+_FS_CODE_RE = re.compile(r'fS_code\s*=\s*"(.*?)";')
+_MANAGER_RE = re.compile(r'Data_currentFundManager\s*=\s*(\[.+?\])\s*;\s*/\*')
+_SYL_RE = re.compile(r'(syl_1n|syl_6y|syl_3y|syl_1y)\s*=\s*"(.*?)";')
+_PERFORMANCE_RE = re.compile(r'Data_performanceEvaluation\s*=\s*(\{.+?\})\s*;\s*/\*')
+_NET_WORTH_TREND_RE = re.compile(r'Data_netWorthTrend\s*=\s*(\[.+?\])\s*;\s*/\*')
+
+
+@functools.lru_cache(maxsize=4096)
 def normalize_asset_code(code: str) -> str:
     """
     Normalize user input to canonical symbol.
@@ -24,19 +105,24 @@ def normalize_asset_code(code: str) -> str:
         return ""
 
     upper = raw.upper()
-    m = re.match(r"^HK\s*0*(\d{4,5})$", upper)
+    m = _HK_PREFIX_RE.match(upper)
     if m:
         return m.group(1).zfill(5)
 
-    m = re.match(r"^0*(\d{4,5})\.HK$", upper)
+    m = _HK_SUFFIX_RE.match(upper)
     if m:
         return m.group(1).zfill(5)
 
     return raw
 
 
+@functools.lru_cache(maxsize=4096)
 def is_hk_code(code: str) -> bool:
-    c = normalize_asset_code(code)
+    raw = str(code or "").strip()
+    # Plain digits (the usual 6-digit fund code) normalize to themselves
+    if raw.isdigit():
+        return len(raw) == 5
+    c = normalize_asset_code(raw)
     return c.isdigit() and len(c) == 5
 
 
@@ -48,11 +134,11 @@ def _get_sina_hk_quote(code: str) -> Dict[str, Any]:
     url = f"http://hq.sinajs.cn/list=hk{norm}"
     headers = {"Referer": "http://finance.sina.com.cn"}
     try:
-        response = requests.get(url, headers=headers, timeout=8)
+        response = _HTTP.get(url, headers=headers, timeout=8)
         if response.status_code != 200:
             return {}
         text = response.text
-        match = re.search(r'="(.*)"', text)
+        match = _SINA_QUOTE_RE.search(text)
         if not match or not match.group(1):
             return {}
         parts = match.group(1).split(",")
@@ -76,6 +162,21 @@ def _get_sina_hk_quote(code: str) -> Dict[str, Any]:
         return {}
 
 
+def _date_strings(values: pd.Series) -> List[str]:
+    """Format a column of dates (date objects, Timestamps or strings) as YYYY-MM-DD."""
+    return pd.to_datetime(values, format="ISO8601").dt.strftime("%Y-%m-%d").tolist()
+
+
+def _sorted_tail(df: pd.DataFrame, column: str, limit: int) -> pd.DataFrame:
+    """
+    Rows in ascending `column` order, only the last `limit` unless limit >= 9999.
+    AkShare already returns history oldest-first, so the sort is usually skipped.
+    """
+    if not df[column].is_monotonic_increasing:
+        df = df.sort_values(by=column, ascending=True)
+    return df.tail(limit) if limit < 9999 else df
+
+
 def _get_ak_hk_history(code: str, limit: int) -> List[Dict[str, Any]]:
     """Free HK daily history source via AkShare."""
     norm = normalize_asset_code(code)
@@ -87,18 +188,10 @@ def _get_ak_hk_history(code: str, limit: int) -> List[Dict[str, Any]]:
             return []
         if "date" not in df.columns or "close" not in df.columns:
             return []
-        df = df.copy().sort_values(by="date", ascending=True)
-        if limit < 9999:
-            df = df.tail(limit)
-        out = []
-        for _, row in df.iterrows():
-            d = row.get("date")
-            close = float(row.get("close") or 0.0)
-            if close <= 0:
-                continue
-            date_str = d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d)[:10]
-            out.append({"date": date_str, "nav": close})
-        return out
+        df = _sorted_tail(df, "date", limit)
+        dates = _date_strings(df["date"])
+        closes = pd.to_numeric(df["close"], errors="coerce").fillna(0.0).tolist()
+        return [{"date": d, "nav": close} for d, close in zip(dates, closes) if close > 0]
     except Exception:
         return []
 
@@ -128,7 +221,7 @@ def _get_yahoo_hk_history(code: str, limit: int) -> List[Dict[str, Any]]:
     url = f"https://query2.finance.yahoo.com/v8/finance/chart/{symbol}?range=10y&interval=1d"
     headers = {"User-Agent": "Mozilla/5.0", "Accept": "application/json"}
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = _HTTP.get(url, headers=headers, timeout=10)
         if resp.status_code != 200:
             return []
         body = resp.json()
@@ -138,16 +231,17 @@ def _get_yahoo_hk_history(code: str, limit: int) -> List[Dict[str, Any]]:
         timestamps = result.get("timestamp") or []
         quote = (((result.get("indicators") or {}).get("quote") or [None])[0]) or {}
         closes = quote.get("close") or []
-        out = []
-        for ts, close in zip(timestamps, closes):
-            if close is None:
-                continue
-            d = datetime.utcfromtimestamp(int(ts)).strftime("%Y-%m-%d")
-            out.append({"date": d, "nav": float(close)})
-        out = sorted(out, key=lambda x: x["date"])
+        # Sort on the raw epoch seconds (already chronological, so timsort is
+        # a single pass) and trim before formatting any dates
+        points = sorted(
+            (int(ts), float(close)) for ts, close in zip(timestamps, closes) if close is not None
+        )
         if limit < 9999:
-            out = out[-limit:]
-        return out
+            points = points[-limit:]
+        if not points:
+            return []
+        dates = pd.to_datetime([ts for ts, _ in points], unit="s").strftime("%Y-%m-%d")
+        return [{"date": d, "nav": close} for d, (_, close) in zip(dates, points)]
     except Exception:
         return []
 
@@ -168,6 +262,7 @@ def _get_yahoo_hk_latest(code: str) -> Dict[str, Any]:
     }
 
 
+@_ttl_cache(FUND_INFO_TTL_SECONDS)
 def _get_hk_name(code: str) -> str:
     data = _get_sina_hk_quote(code)
     return str(data.get("name") or "")
@@ -185,21 +280,10 @@ def get_fund_type(code: str, name: str) -> str:
     Returns:
         Fund type string
     """
-    norm_code = normalize_asset_code(code)
-    conn = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT type FROM funds WHERE code = ?", (norm_code,))
-        row = cursor.fetchone()
-
-        if row and row["type"]:
-            return row["type"]
-    except Exception as e:
-        print(f"DB query error for {code}: {e}")
-    finally:
-        if conn:
-            conn.close()
+    # Same (TTL-cached) funds row get_fund_intraday already looked up
+    official_type = _get_fund_info_from_db(code).get("type")
+    if official_type:
+        return official_type
 
     # Fallback: simple heuristics based on name
     if "债" in name or "纯债" in name or "固收" in name:
@@ -212,6 +296,11 @@ def get_fund_type(code: str, name: str) -> str:
     return "未知"
 
 
+def invalidate_fund_info_cache() -> None:
+    """Drop cached funds-table lookups; call after the fund list is refreshed."""
+    _get_fund_info_from_db.cache_clear()
+
+
 def get_eastmoney_valuation(code: str) -> Dict[str, Any]:
     """
     Fetch real-time valuation from Tiantian Jijin (Eastmoney) API.
@@ -221,12 +310,12 @@ def get_eastmoney_valuation(code: str) -> Dict[str, Any]:
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36)"
     }
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = _HTTP.get(url, headers=headers, timeout=5)
         if response.status_code == 200:
             text = response.text
             # Regex to capture JSON content inside jsonpgz(...)
             # Allow optional semicolon at end
-            match = re.search(r"jsonpgz\((.*)\)", text)
+            match = _JSONPGZ_RE.search(text)
             if match and match.group(1):
                 data = json.loads(match.group(1))
                 return {
@@ -249,10 +338,10 @@ def get_sina_valuation(code: str) -> Dict[str, Any]:
     url = f"http://hq.sinajs.cn/list=fu_{code}"
     headers = {"Referer": "http://finance.sina.com.cn"}
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = _HTTP.get(url, headers=headers, timeout=5)
         text = response.text
         # var hq_str_fu_005827="Name,15:00:00,1.234,1.230,...";
-        match = re.search(r'="(.*)"', text)
+        match = _SINA_QUOTE_RE.search(text)
         if match and match.group(1):
             parts = match.group(1).split(',')
             if len(parts) >= 8:
@@ -268,6 +357,7 @@ def get_sina_valuation(code: str) -> Dict[str, Any]:
     return {}
 
 
+@_ttl_cache(VALUATION_TTL_SECONDS)
 def get_combined_valuation(code: str) -> Dict[str, Any]:
     """
     Try Eastmoney first, fallback to Sina.
@@ -293,6 +383,21 @@ def get_combined_valuation(code: str) -> Dict[str, Any]:
     return data
 
 
+_FUND_SEARCH_SQL = """
+SELECT code, name, type,
+       CASE WHEN code = ? THEN 1 ELSE 0 END AS exact_hit,
+       CASE WHEN code LIKE ? THEN 1 ELSE 0 END AS prefix_hit
+FROM funds
+WHERE {where}
+ORDER BY exact_hit DESC, prefix_hit DESC, code ASC
+LIMIT 20
+"""
+_FUND_SEARCH_LIKE = _FUND_SEARCH_SQL.format(where="code LIKE ? OR name LIKE ?")
+_FUND_SEARCH_FTS = _FUND_SEARCH_SQL.format(
+    where="rowid IN (SELECT rowid FROM funds_fts WHERE funds_fts MATCH ?)"
+)
+
+
 def search_funds(q: str) -> List[Dict[str, Any]]:
     """
     Search funds by keyword using local SQLite DB.
@@ -309,20 +414,21 @@ def search_funds(q: str) -> List[Dict[str, Any]]:
     cursor = conn.cursor()
     
     try:
-        cursor.execute(
-            """
-            SELECT code, name, type,
-                   CASE WHEN code = ? THEN 1 ELSE 0 END AS exact_hit,
-                   CASE WHEN code LIKE ? THEN 1 ELSE 0 END AS prefix_hit
-            FROM funds
-            WHERE code LIKE ? OR name LIKE ?
-            ORDER BY exact_hit DESC, prefix_hit DESC, code ASC
-            LIMIT 20
-            """,
-            (q_norm, prefix_pattern, pattern, pattern),
-        )
-        
-        rows = cursor.fetchall()
+        rows = None
+        if len(q_clean) >= 3:
+            # The trigram index answers substring matches of 3+ characters;
+            # a quoted phrase keeps FTS5 query syntax out of user input
+            phrase = '"' + q_clean.replace('"', '""') + '"'
+            try:
+                cursor.execute(_FUND_SEARCH_FTS, (q_norm, prefix_pattern, phrase))
+                rows = cursor.fetchall()
+            except sqlite3.OperationalError:
+                # No funds_fts on this SQLite build; scan instead
+                rows = None
+        if rows is None:
+            # Short query or no index: fall back to the full scan
+            cursor.execute(_FUND_SEARCH_LIKE, (q_norm, prefix_pattern, pattern, pattern))
+            rows = cursor.fetchall()
         
         results = []
         for row in rows:
@@ -345,43 +451,44 @@ def search_funds(q: str) -> List[Dict[str, Any]]:
         conn.close()
 
 
+@_ttl_cache(PINGZHONG_TTL_SECONDS)
 def get_eastmoney_pingzhong_data(code: str) -> Dict[str, Any]:
     """
     Fetch static detailed data from Eastmoney (PingZhongData).
     """
     url = Config.EASTMONEY_DETAILED_API_URL.format(code=code)
     try:
-        response = requests.get(url, timeout=5)
+        response = _HTTP.get(url, timeout=5)
         if response.status_code == 200:
             text = response.text
             data = {}
-            name_match = re.search(r'fS_name\s*=\s*"(.*?)";', text)
+            name_match = _FS_NAME_RE.search(text)
             if name_match: data["name"] = name_match.group(1)
             
-            code_match = re.search(r'fS_code\s*=\s*"(.*?)";', text)
+            code_match = _FS_CODE_RE.search(text)
             if code_match: data["code"] = code_match.group(1)
             
-            manager_match = re.search(r'Data_currentFundManager\s*=\s*(\[.+?\])\s*;\s*/\*', text)
+            manager_match = _MANAGER_RE.search(text)
             if manager_match:
                 try:
-                    managers = json.loads(manager_match.group(1))
+                    managers = orjson.loads(manager_match.group(1))
                     if managers:
                         data["manager"] = ", ".join([m["name"] for m in managers])
                 except:
                     pass
 
             # Extract Performance Metrics
-            for key in ["syl_1n", "syl_6y", "syl_3y", "syl_1y"]:
-                m = re.search(rf'{key}\s*=\s*"(.*?)";', text)
-                if m: data[key] = m.group(1)
+            # First assignment of each key wins, as with one search per key
+            for m in _SYL_RE.finditer(text):
+                data.setdefault(m.group(1), m.group(2))
 
             # Extract Performance Evaluation (Capability Scores)
             # var Data_performanceEvaluation = {"avr":"72.25","categories":[...],"data":[80.0,70.0...]};
             # Match until `};`
-            perf_match = re.search(r'Data_performanceEvaluation\s*=\s*(\{.+?\})\s*;\s*/\*', text)
+            perf_match = _PERFORMANCE_RE.search(text)
             if perf_match:
                 try:
-                    perf = json.loads(perf_match.group(1))
+                    perf = orjson.loads(perf_match.group(1))
                     if perf and "data" in perf and "categories" in perf:
                         data["performance"] = dict(zip(perf["categories"], perf["data"]))
                 except:
@@ -389,18 +496,16 @@ def get_eastmoney_pingzhong_data(code: str) -> Dict[str, Any]:
 
             # Extract Full History (Data_netWorthTrend)
             # var Data_netWorthTrend = [{"x":1536076800000,"y":1.0,...},...];
-            history_match = re.search(r'Data_netWorthTrend\s*=\s*(\[.+?\])\s*;\s*/\*', text)
+            history_match = _NET_WORTH_TREND_RE.search(text)
             if history_match:
                 try:
-                    raw_hist = json.loads(history_match.group(1))
+                    raw_hist = orjson.loads(history_match.group(1))
                     # Convert to standard format: [{"date": "YYYY-MM-DD", "nav": 1.23}, ...]
                     # x is ms timestamp
+                    stamps = pd.to_datetime([item['x'] for item in raw_hist], unit="ms") + _CST_OFFSET
                     data["history"] = [
-                        {
-                            "date": time.strftime('%Y-%m-%d', time.localtime(item['x']/1000)),
-                            "nav": float(item['y'])
-                        }
-                        for item in raw_hist
+                        {"date": d, "nav": float(item['y'])}
+                        for d, item in zip(stamps.strftime('%Y-%m-%d'), raw_hist)
                     ]
                 except:
                     pass
@@ -411,17 +516,16 @@ def get_eastmoney_pingzhong_data(code: str) -> Dict[str, Any]:
     return {}
 
 
+@_ttl_cache(FUND_INFO_TTL_SECONDS)
 def _get_fund_info_from_db(code: str) -> Dict[str, Any]:
     """
     Get fund basic info from local SQLite cache.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        norm_code = normalize_asset_code(code)
-        cursor.execute("SELECT name, type FROM funds WHERE code = ?", (norm_code,))
-        row = cursor.fetchone()
-        conn.close()
+        with get_read_connection() as conn:
+            row = conn.execute(
+                "SELECT name, type FROM funds WHERE code = ?", (normalize_asset_code(code),)
+            ).fetchone()
         if row:
             return {"name": row["name"], "type": row["type"]}
     except Exception as e:
@@ -472,17 +576,13 @@ def _fetch_stock_spots_sina(codes: List[str]) -> Dict[str, float]:
     headers = {"Referer": "http://finance.sina.com.cn"}
     
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = _HTTP.get(url, headers=headers, timeout=5)
         results = {}
-        for line in response.text.strip().split('\n'):
-            if not line or '=' not in line or '"' not in line: continue
-            
-            # var hq_str_sh600519="..."
-            line_key = line.split('=')[0].split('_str_')[-1] # sh600519 or hk00700 or gb_nvda
+        # var hq_str_sh600519="..."; one match per quote line
+        for m in _SINA_BATCH_RE.finditer(response.text):
+            line_key, data_part = m.groups() # sh600519 or hk00700 or gb_nvda
             original_code = code_map.get(line_key)
             if not original_code: continue
-
-            data_part = line.split('"')[1]
             if not data_part: continue
             parts = data_part.split(',')
             
@@ -518,12 +618,18 @@ def _fetch_stock_spots_sina(codes: List[str]) -> Dict[str, float]:
         return {}
 
 
+_HISTORY_UPSERT = """
+INSERT OR REPLACE INTO fund_history (code, date, nav, updated_at)
+VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+
 def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
     """
     Get historical NAV data with database caching.
     If limit >= 9999, fetch all available history.
     """
-    from ..db import get_db_connection
+    from ..db import get_db_connection, get_write_connection
     import time
 
     norm_code = normalize_asset_code(code)
@@ -536,46 +642,44 @@ def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
         if not hk_history:
             return []
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        for item in hk_history:
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO fund_history (code, date, nav, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                """,
-                (norm_code, item["date"], float(item["nav"])),
+        with get_write_connection() as conn:
+            conn.executemany(
+                _HISTORY_UPSERT,
+                [(norm_code, item["date"], float(item["nav"])) for item in hk_history],
             )
-        conn.commit()
-        conn.close()
         return hk_history
 
     # 1. Try to get from database cache first
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    # Rows come back ascending (oldest to newest) for chart display.
     # If limit is very large, get all data
     if limit >= 9999:
         cursor.execute("""
             SELECT date, nav, updated_at FROM fund_history
             WHERE code = ?
-            ORDER BY date DESC
+            ORDER BY date ASC
         """, (norm_code,))
     else:
         cursor.execute("""
-            SELECT date, nav, updated_at FROM fund_history
-            WHERE code = ?
-            ORDER BY date DESC
-            LIMIT ?
+            SELECT date, nav, updated_at FROM (
+                SELECT date, nav, updated_at FROM fund_history
+                WHERE code = ?
+                ORDER BY date DESC
+                LIMIT ?
+            )
+            ORDER BY date ASC
         """, (norm_code, limit))
 
     rows = cursor.fetchall()
+    conn.close()
 
     # Check if cache is fresh
     cache_valid = False
     if rows:
-        latest_update = rows[0]["updated_at"]
-        latest_nav_date = rows[0]["date"]
+        latest_update = rows[-1]["updated_at"]
+        latest_nav_date = rows[-1]["date"]
         # Parse timestamp
         try:
             from datetime import datetime
@@ -602,43 +706,28 @@ def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
             pass
 
     if cache_valid:
-        conn.close()
-        # Reverse to ascending order (oldest to newest) for chart display
-        return [{"date": row["date"], "nav": float(row["nav"])} for row in reversed(rows)]
+        return [{"date": row["date"], "nav": float(row["nav"])} for row in rows]
 
     # 2. Cache miss or stale, fetch from API
     try:
         df = ak.fund_open_fund_info_em(symbol=norm_code, indicator="单位净值走势")
         if df is None or df.empty:
-            conn.close()
             return []
 
-        # If limit < 9999, take only the most recent N records
-        if limit < 9999:
-            df = df.sort_values(by="净值日期", ascending=False).head(limit)
+        # Ascending for chart display; if limit < 9999, only the most recent N records
+        df = _sorted_tail(df, "净值日期", limit)
 
-        # Sort ascending for chart display
-        df = df.sort_values(by="净值日期", ascending=True)
+        dates = _date_strings(df["净值日期"])
+        navs = df["单位净值"].astype(float).tolist()
+        results = [{"date": d, "nav": nav} for d, nav in zip(dates, navs)]
+
+        # 3. Save to database cache
+        with get_write_connection() as conn:
+            conn.executemany(_HISTORY_UPSERT, zip([norm_code] * len(dates), dates, navs))
 
-        results = []
-        for _, row in df.iterrows():
-            d = row["净值日期"]
-            date_str = d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d)[:10]
-            nav_value = float(row["单位净值"])
-            results.append({"date": date_str, "nav": nav_value})
-
-            # 3. Save to database cache
-            cursor.execute("""
-                INSERT OR REPLACE INTO fund_history (code, date, nav, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            """, (norm_code, date_str, nav_value))
-
-        conn.commit()
-        conn.close()
         return results
     except Exception as e:
         print(f"History fetch error for {code}: {e}")
-        conn.close()
         return []
 
 
@@ -669,10 +758,11 @@ def _calculate_technical_indicators(history: List[Dict[str, Any]]) -> Dict[str,
     try:
         import numpy as np
         # Convert to numpy array of NAVs
-        navs = np.array([item['nav'] for item in history])
+        navs = np.fromiter((item['nav'] for item in history), dtype=np.float64, count=len(history))
         
         # 1. Returns (Daily)
-        daily_returns = np.diff(navs) / navs[:-1]
+        daily_returns = np.diff(navs)
+        daily_returns /= navs[:-1]
         
         # 2. Annualized Return
         total_return = (navs[-1] - navs[0]) / navs[0]
@@ -681,7 +771,7 @@ def _calculate_technical_indicators(history: List[Dict[str, Any]]) -> Dict[str,
         annual_return = (1 + total_return)**(1/years) - 1 if years > 0 else 0
         
         # 3. Annualized Volatility
-        volatility = np.std(daily_returns) * np.sqrt(250)
+        volatility = daily_returns.std() * np.sqrt(250)
         
         # 4. Sharpe Ratio (Risk-free rate = 2%)
         rf = 0.02
@@ -690,8 +780,9 @@ def _calculate_technical_indicators(history: List[Dict[str, Any]]) -> Dict[str,
         # 5. Max Drawdown
         # Running max
         rolling_max = np.maximum.accumulate(navs)
-        drawdowns = (navs - rolling_max) / rolling_max
-        max_drawdown = np.min(drawdowns)
+        drawdowns = navs - rolling_max
+        drawdowns /= rolling_max
+        max_drawdown = drawdowns.min()
         
         return {
             "sharpe": round(float(sharpe), 2),
@@ -708,14 +799,32 @@ def _calculate_technical_indicators(history: List[Dict[str, Any]]) -> Dict[str,
             "annual_return": "--"
         }
 
+def _get_holdings_df(code: str) -> Optional[pd.DataFrame]:
+    """Latest published stock holdings: this year's report, else last year's."""
+    current_year = str(time.localtime().tm_year)
+    holdings_df = ak.fund_portfolio_hold_em(symbol=code, date=current_year)
+    if holdings_df is None or holdings_df.empty:
+        prev_year = str(time.localtime().tm_year - 1)
+        holdings_df = ak.fund_portfolio_hold_em(symbol=code, date=prev_year)
+    return holdings_df
+
+
 def get_fund_intraday(code: str) -> Dict[str, Any]:
     """
     Get fund holdings + real-time valuation estimate.
     """
     norm_code = normalize_asset_code(code)
 
+    # The valuation, detail page, DB row and holdings report don't depend on
+    # each other, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        em_future = executor.submit(get_combined_valuation, norm_code)
+        pz_future = executor.submit(get_eastmoney_pingzhong_data, norm_code)
+        db_future = executor.submit(_get_fund_info_from_db, norm_code)
+        holdings_future = executor.submit(_get_holdings_df, norm_code)
+
     # 1) Get real-time valuation (Multi-source)
-    em_data = get_combined_valuation(norm_code)
+    em_data = em_future.result()
     
     name = em_data.get("name")
     nav = float(em_data.get("nav", 0.0))
@@ -724,14 +833,14 @@ def get_fund_intraday(code: str) -> Dict[str, Any]:
     update_time = em_data.get("time", time.strftime("%H:%M:%S"))
 
     # 1.5) Enrich with detailed info
-    pz_data = get_eastmoney_pingzhong_data(norm_code)
+    pz_data = pz_future.result()
     extra_info = {}
     if pz_data.get("name"): extra_info["full_name"] = pz_data["name"]
     if pz_data.get("manager"): extra_info["manager"] = pz_data["manager"]
     for k in ["syl_1n", "syl_6y", "syl_3y", "syl_1y"]:
         if pz_data.get(k): extra_info[k] = pz_data[k]
     
-    db_info = _get_fund_info_from_db(norm_code)
+    db_info = db_future.result()
     if db_info:
         if not extra_info.get("full_name"): extra_info["full_name"] = db_info["name"]
         extra_info["official_type"] = db_info["type"]
@@ -755,12 +864,7 @@ def get_fund_intraday(code: str) -> Dict[str, Any]:
     holdings = []
     concentration_rate = 0.0
     try:
-        current_year = str(time.localtime().tm_year)
-        holdings_df = ak.fund_portfolio_hold_em(symbol=norm_code, date=current_year)
-        if holdings_df is None or holdings_df.empty:
-             prev_year = str(time.localtime().tm_year - 1)
-             holdings_df = ak.fund_portfolio_hold_em(symbol=norm_code, date=prev_year)
-             
+        holdings_df = holdings_future.result()
         if not holdings_df.empty:
             holdings_df = holdings_df.copy()
             if "占净值比例" in holdings_df.columns:
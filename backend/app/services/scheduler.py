@@ -4,9 +4,9 @@ import time
 from datetime import datetime, timedelta, timezone
 import akshare as ak
 import pandas as pd
-from ..db import get_db_connection
+from ..db import get_db_connection, get_write_connection, optimize_db
 from ..config import Config
-from ..services.fund import get_combined_valuation
+from ..services.fund import get_combined_valuation, invalidate_fund_info_cache
 from ..services.subscription import get_active_subscriptions, update_notification_time
 from ..services.email import send_email
 from ..services.trade import process_pending_transactions
@@ -16,6 +16,9 @@ logger = logging.getLogger(__name__)
 # Define China Standard Time (UTC+8)
 CST = timezone(timedelta(hours=8))
 
+# How often the loop refreshes SQLite planner statistics
+OPTIMIZE_INTERVAL_SECONDS = 15 * 60
+
 def fetch_and_update_funds():
     """
     Fetches the complete fund list from AkShare and updates the SQLite DB.
@@ -40,21 +43,21 @@ def fetch_and_update_funds():
         # Select only relevant columns
         data_to_insert = df[["code", "name", "type"]].to_dict(orient="records")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Use transaction for speed and safety
-        conn.execute("BEGIN")
-        
-        # Upsert logic (Replace is easier here since we just want the latest list)
-        # Using executemany is much faster than looping
-        cursor.executemany("""
-            INSERT OR REPLACE INTO funds (code, name, type, updated_at)
-            VALUES (:code, :name, :type, CURRENT_TIMESTAMP)
-        """, data_to_insert)
-        
-        conn.commit()
-        conn.close()
+        # One writer transaction for speed and safety
+        with get_write_connection() as conn:
+            # Upsert in place: REPLACE would delete and reinsert under new rowids,
+            # which the funds_fts triggers (and the index) key on
+            # Using executemany is much faster than looping
+            conn.executemany("""
+                INSERT INTO funds (code, name, type, updated_at)
+                VALUES (:code, :name, :type, CURRENT_TIMESTAMP)
+                ON CONFLICT(code) DO UPDATE SET
+                    name = excluded.name,
+                    type = excluded.type,
+                    updated_at = excluded.updated_at
+            """, data_to_insert)
+
+        invalidate_fund_info_cache()
         
         logger.info(f"Fund list updated. Total funds: {len(data_to_insert)}")
         
@@ -87,32 +90,33 @@ def collect_intraday_snapshots():
     cursor = conn.cursor()
     cursor.execute("SELECT DISTINCT code FROM positions WHERE shares > 0")
     codes = [row["code"] for row in cursor.fetchall()]
+    conn.close()
 
     if not codes:
-        conn.close()
         return
 
-    # 4. Collect valuation data
+    # 4. Collect valuation data (network first, so the writer isn't held across it)
     date_str = today.strftime("%Y-%m-%d")
     time_str = now_cst.strftime("%H:%M")
 
-    collected = 0
+    snapshots = []
     for code in codes:
         try:
             data = get_combined_valuation(code)
             if data and data.get("estimate"):
-                cursor.execute("""
-                    INSERT OR IGNORE INTO fund_intraday_snapshots
-                    (fund_code, date, time, estimate)
-                    VALUES (?, ?, ?, ?)
-                """, (code, date_str, time_str, float(data["estimate"])))
-                collected += 1
+                snapshots.append((code, date_str, time_str, float(data["estimate"])))
             time.sleep(0.2)  # Avoid API rate limiting (reduced from 0.5s)
         except Exception as e:
             logger.error(f"Intraday collect failed for {code}: {e}")
 
-    conn.commit()
-    conn.close()
+    if snapshots:
+        with get_write_connection() as conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO fund_intraday_snapshots
+                (fund_code, date, time, estimate)
+                VALUES (?, ?, ?, ?)
+            """, snapshots)
+    collected = len(snapshots)
 
     if collected > 0:
         logger.info(f"Collected {collected} intraday snapshots at {time_str}")
@@ -125,12 +129,8 @@ def cleanup_old_intraday_data():
     now_cst = datetime.now(CST)
     cutoff = (now_cst - timedelta(days=30)).strftime("%Y-%m-%d")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM fund_intraday_snapshots WHERE date < ?", (cutoff,))
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        deleted = conn.execute("DELETE FROM fund_intraday_snapshots WHERE date < ?", (cutoff,)).rowcount
 
     if deleted > 0:
         logger.info(f"Cleaned up {deleted} old intraday records (before {cutoff})")
@@ -289,6 +289,7 @@ def start_scheduler():
         # 2. Main loop
         last_cleanup_date = None
         last_nav_update_hour = None
+        last_optimize_at = time.monotonic()
 
         while True:
             try:
@@ -324,6 +325,11 @@ def start_scheduler():
                     update_holdings_nav()
                     last_nav_update_hour = now_cst.hour
 
+                # Keep planner stats fresh as history / orders grow
+                if time.monotonic() - last_optimize_at >= OPTIMIZE_INTERVAL_SECONDS:
+                    optimize_db()
+                    last_optimize_at = time.monotonic()
+
             except Exception as e:
                 logger.error(f"Scheduler loop error: {e}")
 
@@ -8,10 +8,11 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import akshare as ak
 import numpy as np
+import orjson
 import pandas as pd
 import requests
 
-from ..db import get_db_connection
+from ..db import db_conn, get_db_connection, get_read_connection, get_write_connection
 from .fund import get_combined_valuation, get_fund_history, normalize_asset_code
 from .account import upsert_position, remove_position
 from ..config import Config
@@ -278,11 +279,8 @@ def _get_price_and_name(code: str) -> Tuple[Optional[float], str, float]:
 
     # Try local fund metadata for name fallback.
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM funds WHERE code = ?", (code,))
-        row = cursor.fetchone()
-        conn.close()
+        with db_conn() as conn:
+            row = conn.execute("SELECT name FROM funds WHERE code = ?", (code,)).fetchone()
         if row and row["name"]:
             name = row["name"]
     except Exception:
@@ -376,34 +374,33 @@ def _invalidate_perf_cache(portfolio_id: Optional[int] = None):
 
 
 def _fetch_account_positions(account_id: int, code_scope: Optional[List[str]] = None) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_conn() as conn:
+        cursor = conn.cursor()
 
-    if code_scope:
-        cursor.execute(
-            """
-            SELECT code, shares, cost
-            FROM positions
-            WHERE account_id = ? AND shares > 0
-            """,
-            (account_id,),
-        )
-        wanted = {normalize_asset_code(c) for c in code_scope if normalize_asset_code(c)}
-        rows = [
-            row for row in cursor.fetchall()
-            if normalize_asset_code(str(row["code"])) in wanted
-        ]
-    else:
-        cursor.execute(
-            """
-            SELECT code, shares, cost
-            FROM positions
-            WHERE account_id = ? AND shares > 0
-            """,
-            (account_id,),
-        )
-        rows = cursor.fetchall()
-    conn.close()
+        if code_scope:
+            cursor.execute(
+                """
+                SELECT code, shares, cost
+                FROM positions
+                WHERE account_id = ? AND shares > 0
+                """,
+                (account_id,),
+            )
+            wanted = {normalize_asset_code(c) for c in code_scope if normalize_asset_code(c)}
+            rows = [
+                row for row in cursor.fetchall()
+                if normalize_asset_code(str(row["code"])) in wanted
+            ]
+        else:
+            cursor.execute(
+                """
+                SELECT code, shares, cost
+                FROM positions
+                WHERE account_id = ? AND shares > 0
+                """,
+                (account_id,),
+            )
+            rows = cursor.fetchall()
     out = []
     for row in rows:
         code = normalize_asset_code(str(row["code"]))
@@ -414,7 +411,7 @@ def _fetch_account_positions(account_id: int, code_scope: Optional[List[str]] =
 
 
 def list_portfolios(account_id: Optional[int] = None) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     if account_id:
@@ -453,7 +450,7 @@ def list_portfolios(account_id: Optional[int] = None) -> List[Dict[str, Any]]:
 
 
 def get_portfolio_detail(portfolio_id: int) -> Dict[str, Any]:
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
 
     cursor.execute(
@@ -496,7 +493,7 @@ def get_portfolio_detail(portfolio_id: int) -> Dict[str, Any]:
 
 
 def _get_version_holdings(version_id: int) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -533,9 +530,8 @@ def create_portfolio(
     normalized_scope = _normalize_codes(scope_codes) or [h["code"] for h in normalized]
     effective_date = effective_date or date.today().strftime("%Y-%m-%d")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             INSERT INTO strategy_portfolios (name, account_id, benchmark, fee_rate, scope_codes)
@@ -562,19 +558,13 @@ def create_portfolio(
             [(version_id, h["code"], h["weight"]) for h in normalized],
         )
 
-        conn.commit()
-        _invalidate_perf_cache(portfolio_id)
-        return {
-            "id": portfolio_id,
-            "active_version_id": version_id,
-            "holdings": normalized,
-            "scope_codes": normalized_scope,
-        }
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    _invalidate_perf_cache(portfolio_id)
+    return {
+        "id": portfolio_id,
+        "active_version_id": version_id,
+        "holdings": normalized,
+        "scope_codes": normalized_scope,
+    }
 
 
 def create_strategy_version(
@@ -591,18 +581,16 @@ def create_strategy_version(
     normalized_scope = _normalize_codes(scope_codes)
     effective_date = effective_date or date.today().strftime("%Y-%m-%d")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("SELECT id FROM strategy_portfolios WHERE id = ?", (portfolio_id,))
-    if not cursor.fetchone():
-        conn.close()
-        raise ValueError("strategy portfolio not found")
+        cursor.execute("SELECT id FROM strategy_portfolios WHERE id = ?", (portfolio_id,))
+        if not cursor.fetchone():
+            raise ValueError("strategy portfolio not found")
 
-    cursor.execute("SELECT COALESCE(MAX(version_no), 0) AS max_version FROM strategy_versions WHERE portfolio_id = ?", (portfolio_id,))
-    version_no = int(cursor.fetchone()["max_version"]) + 1
+        cursor.execute("SELECT COALESCE(MAX(version_no), 0) AS max_version FROM strategy_versions WHERE portfolio_id = ?", (portfolio_id,))
+        version_no = int(cursor.fetchone()["max_version"]) + 1
 
-    try:
         if activate:
             cursor.execute("UPDATE strategy_versions SET is_active = 0 WHERE portfolio_id = ?", (portfolio_id,))
 
@@ -644,42 +632,28 @@ def create_strategy_version(
             [(version_id, h["code"], h["weight"]) for h in normalized],
         )
 
-        conn.commit()
-        _invalidate_perf_cache(portfolio_id)
-        return {
-            "id": version_id,
-            "version_no": version_no,
-            "holdings": normalized,
-            "is_active": activate,
-            "scope_codes": normalized_scope,
-        }
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+    _invalidate_perf_cache(portfolio_id)
+    return {
+        "id": version_id,
+        "version_no": version_no,
+        "holdings": normalized,
+        "is_active": activate,
+        "scope_codes": normalized_scope,
+    }
 
 
 def update_portfolio_scope(portfolio_id: int, scope_codes: List[str]) -> Dict[str, Any]:
     normalized_scope = _normalize_codes(scope_codes)
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM strategy_portfolios WHERE id = ?", (portfolio_id,))
-    if not cursor.fetchone():
-        conn.close()
-        raise ValueError("strategy portfolio not found")
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM strategy_portfolios WHERE id = ?", (portfolio_id,))
+        if not cursor.fetchone():
+            raise ValueError("strategy portfolio not found")
 
-    try:
         cursor.execute(
             "UPDATE strategy_portfolios SET scope_codes = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
             (json.dumps(normalized_scope, ensure_ascii=False), portfolio_id),
         )
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
     _invalidate_perf_cache(portfolio_id)
     return {"ok": True, "scope_codes": normalized_scope}
@@ -833,9 +807,8 @@ def generate_rebalance_orders(
 
     batch_id: Optional[int] = None
     if persist:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        try:
+        with get_write_connection() as conn:
+            cursor = conn.cursor()
             normalized_title = str(batch_title or "").strip() or "智能调仓批次"
             cursor.execute(
                 """
@@ -894,13 +867,7 @@ def generate_rebalance_orders(
                     "UPDATE rebalance_batches SET status='completed', completed_at=CURRENT_TIMESTAMP WHERE id = ?",
                     (batch_id,),
                 )
-            conn.commit()
-            _invalidate_perf_cache(portfolio_id)
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        _invalidate_perf_cache(portfolio_id)
 
     return {
         "batch_id": batch_id,
@@ -921,36 +888,33 @@ def generate_rebalance_orders(
 
 
 def refresh_rebalance_batch(batch_id: int) -> Dict[str, Any]:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, portfolio_id, account_id, version_id, status, title, note
-        FROM rebalance_batches
-        WHERE id = ?
-        """,
-        (batch_id,),
-    )
-    batch = cursor.fetchone()
-    if not batch:
-        conn.close()
-        raise ValueError("batch not found")
-    if batch["status"] == "completed":
-        conn.close()
-        raise ValueError("该批次已归档，无法刷新")
+    with db_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, portfolio_id, account_id, version_id, status, title, note
+            FROM rebalance_batches
+            WHERE id = ?
+            """,
+            (batch_id,),
+        )
+        batch = cursor.fetchone()
+        if not batch:
+            raise ValueError("batch not found")
+        if batch["status"] == "completed":
+            raise ValueError("该批次已归档，无法刷新")
 
-    cursor.execute(
-        """
-        SELECT COUNT(*) AS cnt
-        FROM rebalance_orders
-        WHERE batch_id = ? AND action IN ('buy','sell') AND status != 'suggested'
-        """,
-        (batch_id,),
-    )
-    edited_count = int(cursor.fetchone()["cnt"] or 0)
-    if edited_count > 0:
-        conn.close()
-        raise ValueError("该批次已有执行/跳过记录，无法整批刷新")
+        cursor.execute(
+            """
+            SELECT COUNT(*) AS cnt
+            FROM rebalance_orders
+            WHERE batch_id = ? AND action IN ('buy','sell') AND status != 'suggested'
+            """,
+            (batch_id,),
+        )
+        edited_count = int(cursor.fetchone()["cnt"] or 0)
+        if edited_count > 0:
+            raise ValueError("该批次已有执行/跳过记录，无法整批刷新")
 
     params = {"min_deviation": 0.005, "lot_size": 100, "capital_adjustment": 0.0}
     try:
@@ -979,7 +943,9 @@ def refresh_rebalance_batch(batch_id: int) -> Dict[str, Any]:
     orders = calc.get("orders", [])
     actionable_count = int(calc.get("summary", {}).get("actionable_count", 0) or 0)
 
-    try:
+    # Orders are priced above, outside the write transaction
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("DELETE FROM rebalance_orders WHERE batch_id = ?", (batch_id,))
         cursor.executemany(
             """
@@ -1021,12 +987,6 @@ def refresh_rebalance_batch(batch_id: int) -> Dict[str, Any]:
                 "UPDATE rebalance_batches SET status='pending', completed_at=NULL, note=? WHERE id = ?",
                 (json.dumps(params, ensure_ascii=False), batch_id),
             )
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
     _invalidate_perf_cache(int(batch["portfolio_id"]))
     return {"ok": True, "batch_id": int(batch_id), "actionable_count": actionable_count}
@@ -1103,31 +1063,24 @@ def list_rebalance_orders(
         )
 
     rows = [dict(row) for row in cursor.fetchall()]
-    updated = False
+    conn.close()
+    skipped_ids = []
+    named = []
     for row in rows:
         if row.get("action") == "hold" and row.get("status") == "suggested":
             row["status"] = "skipped"
-            updated = True
-            try:
-                cursor.execute(
-                    "UPDATE rebalance_orders SET status = 'skipped' WHERE id = ?",
-                    (row["id"],),
-                )
-            except Exception:
-                pass
+            skipped_ids.append((row["id"],))
         if not row.get("fund_name"):
             row["fund_name"] = _resolve_fund_name(str(row.get("fund_code") or ""))
-            updated = True
-            try:
-                cursor.execute(
-                    "UPDATE rebalance_orders SET fund_name = ? WHERE id = ?",
-                    (row["fund_name"], row["id"]),
-                )
-            except Exception:
-                pass
-    if updated:
-        conn.commit()
-    conn.close()
+            named.append((row["fund_name"], row["id"]))
+    if skipped_ids or named:
+        # Best-effort backfill; the rows above are already corrected
+        try:
+            with get_write_connection() as conn:
+                conn.executemany("UPDATE rebalance_orders SET status = 'skipped' WHERE id = ?", skipped_ids)
+                conn.executemany("UPDATE rebalance_orders SET fund_name = ? WHERE id = ?", named)
+        except Exception:
+            pass
     return rows
 
 
@@ -1139,7 +1092,7 @@ def _refresh_batch_status(batch_id: Optional[int]):
 
 
 def list_rebalance_batches(portfolio_id: int, account_id: int) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -1182,45 +1135,35 @@ def list_rebalance_batches(portfolio_id: int, account_id: int) -> List[Dict[str,
 
 
 def complete_rebalance_batch(batch_id: int) -> Dict[str, Any]:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, portfolio_id, status FROM rebalance_batches WHERE id = ?",
-        (batch_id,),
-    )
-    batch = cursor.fetchone()
-    if not batch:
-        conn.close()
-        raise ValueError("batch not found")
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, portfolio_id, status FROM rebalance_batches WHERE id = ?",
+            (batch_id,),
+        )
+        batch = cursor.fetchone()
+        if not batch:
+            raise ValueError("batch not found")
 
-    if batch["status"] == "completed":
-        conn.close()
-        return {"ok": True, "batch_id": batch_id, "status": "completed"}
+        if batch["status"] == "completed":
+            return {"ok": True, "batch_id": batch_id, "status": "completed"}
 
-    cursor.execute(
-        """
-        SELECT COUNT(*) AS cnt
-        FROM rebalance_orders
-        WHERE batch_id = ? AND action IN ('buy','sell') AND status = 'suggested'
-        """,
-        (batch_id,),
-    )
-    pending = int(cursor.fetchone()["cnt"] or 0)
-    if pending > 0:
-        conn.close()
-        raise ValueError("仍有待执行指令，无法完成批次")
+        cursor.execute(
+            """
+            SELECT COUNT(*) AS cnt
+            FROM rebalance_orders
+            WHERE batch_id = ? AND action IN ('buy','sell') AND status = 'suggested'
+            """,
+            (batch_id,),
+        )
+        pending = int(cursor.fetchone()["cnt"] or 0)
+        if pending > 0:
+            raise ValueError("仍有待执行指令，无法完成批次")
 
-    try:
         cursor.execute(
             "UPDATE rebalance_batches SET status = 'completed', completed_at = CURRENT_TIMESTAMP WHERE id = ?",
             (batch_id,),
         )
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
     _invalidate_perf_cache(int(batch["portfolio_id"]))
     return {"ok": True, "batch_id": batch_id, "status": "completed"}
@@ -1239,26 +1182,23 @@ def update_rebalance_order_status(order_id: int, status: str) -> Dict[str, Any]:
     if status not in {"suggested", "executed", "skipped"}:
         raise ValueError("invalid status")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, portfolio_id, batch_id FROM rebalance_orders WHERE id = ?", (order_id,))
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        raise ValueError("order not found")
-    _assert_batch_editable(cursor, row["batch_id"])
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, portfolio_id, batch_id FROM rebalance_orders WHERE id = ?", (order_id,))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError("order not found")
+        _assert_batch_editable(cursor, row["batch_id"])
 
-    executed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S") if status == "executed" else None
-    cursor.execute(
-        """
-        UPDATE rebalance_orders
-        SET status = ?, executed_at = ?
-        WHERE id = ?
-        """,
-        (status, executed_at, order_id),
-    )
-    conn.commit()
-    conn.close()
+        executed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S") if status == "executed" else None
+        cursor.execute(
+            """
+            UPDATE rebalance_orders
+            SET status = ?, executed_at = ?
+            WHERE id = ?
+            """,
+            (status, executed_at, order_id),
+        )
     _invalidate_perf_cache(int(row["portfolio_id"]))
     _refresh_batch_status(row["batch_id"])
     return {"ok": True}
@@ -1275,43 +1215,41 @@ def execute_rebalance_order(
     if executed_price <= 0:
         raise ValueError("executed_price must be > 0")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, portfolio_id, account_id, fund_code, action, fee
-               , batch_id
-        FROM rebalance_orders
-        WHERE id = ?
-        """,
-        (order_id,),
-    )
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        raise ValueError("order not found")
-    _assert_batch_editable(cursor, row["batch_id"])
+    # Read, check and write in one transaction on the writer
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, portfolio_id, account_id, fund_code, action, fee
+                   , batch_id
+            FROM rebalance_orders
+            WHERE id = ?
+            """,
+            (order_id,),
+        )
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError("order not found")
+        _assert_batch_editable(cursor, row["batch_id"])
 
-    if row["action"] not in {"buy", "sell"}:
-        conn.close()
-        raise ValueError("only buy/sell orders can be executed")
+        if row["action"] not in {"buy", "sell"}:
+            raise ValueError("only buy/sell orders can be executed")
 
-    account_id = int(row["account_id"])
-    code = row["fund_code"]
-    action = row["action"]
-    fee = float(row["fee"] or 0.0)
+        account_id = int(row["account_id"])
+        code = row["fund_code"]
+        action = row["action"]
+        fee = float(row["fee"] or 0.0)
 
-    cursor.execute(
-        "SELECT shares, cost FROM positions WHERE account_id = ? AND code = ?",
-        (account_id, code),
-    )
-    pos = cursor.fetchone()
-    old_shares = float(pos["shares"]) if pos else 0.0
-    old_cost = float(pos["cost"]) if pos else 0.0
+        cursor.execute(
+            "SELECT shares, cost FROM positions WHERE account_id = ? AND code = ?",
+            (account_id, code),
+        )
+        pos = cursor.fetchone()
+        old_shares = float(pos["shares"]) if pos else 0.0
+        old_cost = float(pos["cost"]) if pos else 0.0
 
-    trade_amount = round(executed_shares * executed_price, 2)
+        trade_amount = round(executed_shares * executed_price, 2)
 
-    try:
         if action == "buy":
             new_shares = round(old_shares + executed_shares, 4)
             if new_shares <= 0:
@@ -1320,7 +1258,7 @@ def execute_rebalance_order(
                 new_cost = round((old_cost * old_shares + executed_price * executed_shares) / new_shares, 4)
             else:
                 new_cost = round(executed_price, 4)
-            upsert_position(account_id, code, new_cost, new_shares)
+            upsert_position(account_id, code, new_cost, new_shares, conn)
         else:
             if old_shares <= 0:
                 raise ValueError("position not found for sell execution")
@@ -1328,11 +1266,11 @@ def execute_rebalance_order(
                 raise ValueError(f"executed_shares exceeds current shares ({old_shares})")
             new_shares = round(old_shares - executed_shares, 4)
             if new_shares <= 0:
-                remove_position(account_id, code)
+                remove_position(account_id, code, conn)
                 new_cost = 0.0
             else:
                 new_cost = old_cost
-                upsert_position(account_id, code, new_cost, new_shares)
+                upsert_position(account_id, code, new_cost, new_shares, conn)
 
         cursor.execute(
             """
@@ -1347,12 +1285,6 @@ def execute_rebalance_order(
             """,
             (executed_shares, executed_price, trade_amount, note, order_id),
         )
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
     _invalidate_perf_cache(int(row["portfolio_id"]))
     _refresh_batch_status(row["batch_id"])
@@ -1370,14 +1302,12 @@ def execute_rebalance_order(
 
 
 def delete_portfolio(portfolio_id: int) -> Dict[str, Any]:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM strategy_portfolios WHERE id = ?", (portfolio_id,))
-    if not cursor.fetchone():
-        conn.close()
-        raise ValueError("strategy portfolio not found")
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM strategy_portfolios WHERE id = ?", (portfolio_id,))
+        if not cursor.fetchone():
+            raise ValueError("strategy portfolio not found")
 
-    try:
         # Explicit delete to avoid relying on foreign_key pragma.
         cursor.execute("SELECT id FROM strategy_versions WHERE portfolio_id = ?", (portfolio_id,))
         version_ids = [int(r["id"]) for r in cursor.fetchall()]
@@ -1396,12 +1326,6 @@ def delete_portfolio(portfolio_id: int) -> Dict[str, Any]:
         cursor.execute("DELETE FROM rebalance_orders WHERE portfolio_id = ?", (portfolio_id,))
         cursor.execute("DELETE FROM strategy_versions WHERE portfolio_id = ?", (portfolio_id,))
         cursor.execute("DELETE FROM strategy_portfolios WHERE id = ?", (portfolio_id,))
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
     _invalidate_perf_cache(portfolio_id)
     return {"ok": True}
@@ -1470,30 +1394,29 @@ def get_portfolio_positions_view(portfolio_id: int, account_id: int) -> Dict[str
 
 
 def _get_db_history_series(code: str, start_date: pd.Timestamp, end_date: Optional[pd.Timestamp] = None) -> pd.Series:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if end_date is None:
-        cursor.execute(
-            """
-            SELECT date, nav
-            FROM fund_history
-            WHERE code = ? AND date >= ?
-            ORDER BY date ASC
-            """,
-            (code, start_date.strftime("%Y-%m-%d")),
-        )
-    else:
-        cursor.execute(
-            """
-            SELECT date, nav
-            FROM fund_history
-            WHERE code = ? AND date >= ? AND date <= ?
-            ORDER BY date ASC
-            """,
-            (code, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
-        )
-    rows = cursor.fetchall()
-    conn.close()
+    with db_conn() as conn:
+        cursor = conn.cursor()
+        if end_date is None:
+            cursor.execute(
+                """
+                SELECT date, nav
+                FROM fund_history
+                WHERE code = ? AND date >= ?
+                ORDER BY date ASC
+                """,
+                (code, start_date.strftime("%Y-%m-%d")),
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT date, nav
+                FROM fund_history
+                WHERE code = ? AND date >= ? AND date <= ?
+                ORDER BY date ASC
+                """,
+                (code, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+            )
+        rows = cursor.fetchall()
 
     if not rows:
         return pd.Series(dtype=float)
@@ -1743,10 +1666,9 @@ def _json_hash(obj: Dict[str, Any]) -> str:
 
 
 def _build_history_data_tag(codes: List[str], start_date: pd.Timestamp, end_date: pd.Timestamp) -> str:
-    conn = get_db_connection()
-    cursor = conn.cursor()
     parts: List[str] = []
-    try:
+    with db_conn() as conn:
+        cursor = conn.cursor()
         for code in sorted(set(codes)):
             cursor.execute(
                 """
@@ -1760,8 +1682,6 @@ def _build_history_data_tag(codes: List[str], start_date: pd.Timestamp, end_date
             ts = str(row[0] or "")
             cnt = int(row[1] or 0)
             parts.append(f"{code}:{ts}:{cnt}")
-    finally:
-        conn.close()
     return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
 
 
@@ -1778,9 +1698,8 @@ def _load_backtest_cache(
     if cached and now - cached[0] <= BACKTEST_CACHE_TTL_SECONDS:
         return cached[1]
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+    with db_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             SELECT result_json, created_at
@@ -1794,13 +1713,11 @@ def _load_backtest_cache(
             (portfolio_id, account_id, version_id, query_hash, data_tag),
         )
         row = cursor.fetchone()
-    finally:
-        conn.close()
 
     if not row:
         return None
     try:
-        result = json.loads(row["result_json"])
+        result = orjson.loads(row["result_json"])
     except Exception:
         return None
     _BACKTEST_MEM_CACHE[mem_key] = (now, result)
@@ -1818,23 +1735,20 @@ def _save_backtest_cache(
     mem_key = (portfolio_id, account_id, f"{version_id}:{query_hash}:{data_tag}")
     _BACKTEST_MEM_CACHE[mem_key] = (time.time(), result)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
+    with get_write_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             INSERT OR REPLACE INTO strategy_backtest_cache (
                 portfolio_id, account_id, version_id, query_hash, data_tag, result_json
             ) VALUES (?, ?, ?, ?, ?, ?)
             """,
-            (portfolio_id, account_id, version_id, query_hash, data_tag, json.dumps(result, ensure_ascii=False)),
+            (
+                portfolio_id, account_id, version_id, query_hash, data_tag,
+                # Still JSON text, so exports and older builds read it as before
+                orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY).decode(),
+            ),
         )
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 def run_backtest(
@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime
-from ..db import get_db_connection
+from ..db import get_db_connection, get_write_connection
 
 logger = logging.getLogger(__name__)
 
@@ -8,18 +8,13 @@ def add_subscription(code: str, email: str, up: float, down: float, enable_diges
     """
     Save or update a subscription for a fund/email pair.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # We allow one subscription per fund+email combination
-    cursor.execute("""
-        INSERT OR REPLACE INTO subscriptions 
-        (code, email, threshold_up, threshold_down, enable_digest, digest_time, enable_volatility)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (code, email, up, down, int(enable_digest), digest_time, int(enable_volatility)))
-    
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        # We allow one subscription per fund+email combination
+        conn.execute("""
+            INSERT OR REPLACE INTO subscriptions 
+            (code, email, threshold_up, threshold_down, enable_digest, digest_time, enable_volatility)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (code, email, up, down, int(enable_digest), digest_time, int(enable_volatility)))
     logger.info(f"Subscription updated: {email} -> {code} (Volatility: {enable_volatility}, Digest: {enable_digest} @ {digest_time})")
 
 def get_active_subscriptions():
@@ -31,15 +26,9 @@ def get_active_subscriptions():
     return rows
 
 def update_notification_time(sub_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE subscriptions SET last_notified_at = CURRENT_TIMESTAMP WHERE id = ?", (sub_id,))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute("UPDATE subscriptions SET last_notified_at = CURRENT_TIMESTAMP WHERE id = ?", (sub_id,))
 
 def update_digest_time(sub_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE subscriptions SET last_digest_at = CURRENT_TIMESTAMP WHERE id = ?", (sub_id,))
-    conn.commit()
-    conn.close()
+    with get_write_connection() as conn:
+        conn.execute("UPDATE subscriptions SET last_digest_at = CURRENT_TIMESTAMP WHERE id = ?", (sub_id,))
@@ -6,7 +6,7 @@ import logging
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from ..db import get_db_connection
+from ..db import get_db_connection, get_write_connection
 from .fund import get_nav_on_date
 from .account import upsert_position, remove_position
 from .trading_calendar import get_confirm_date, confirm_date_to_str
@@ -14,12 +14,12 @@ from .trading_calendar import get_confirm_date, confirm_date_to_str
 logger = logging.getLogger(__name__)
 
 
-def _get_position(account_id: int, code: str) -> Optional[Dict[str, Any]]:
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT code, cost, shares FROM positions WHERE account_id = ? AND code = ?", (account_id, code))
-    row = cursor.fetchone()
-    conn.close()
+def _get_position(account_id: int, code: str, conn=None) -> Optional[Dict[str, Any]]:
+    # Inside a write block, pass the writer so the read sees its transaction
+    if conn is None:
+        with get_db_connection() as conn:
+            return _get_position(account_id, code, conn)
+    row = conn.execute("SELECT code, cost, shares FROM positions WHERE account_id = ? AND code = ?", (account_id, code)).fetchone()
     if not row:
         return None
     return {"code": row["code"], "cost": float(row["cost"]), "shares": float(row["shares"])}
@@ -36,29 +36,25 @@ def add_position_trade(account_id: int, code: str, amount_cny: float, trade_ts:
     confirm_date_str = confirm_date_to_str(confirm_d)
     nav = get_nav_on_date(code, confirm_date_str)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     if nav and nav > 0:
         shares_added = round(amount_cny / nav, 4)
-        pos = _get_position(account_id, code)
-        if pos:
-            old_cost, old_shares = pos["cost"], pos["shares"]
-            new_shares = old_shares + shares_added
-            new_cost = round((old_cost * old_shares + nav * shares_added) / new_shares, 4)
-        else:
-            new_shares = shares_added
-            new_cost = nav
-        upsert_position(account_id, code, new_cost, new_shares)
-        cursor.execute(
-            """
-            INSERT INTO transactions (account_id, code, op_type, amount_cny, confirm_date, confirm_nav, shares_added, cost_after, applied_at)
-            VALUES (?, ?, 'add', ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            (account_id, code, amount_cny, confirm_date_str, nav, shares_added, new_cost),
-        )
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            pos = _get_position(account_id, code, conn)
+            if pos:
+                old_cost, old_shares = pos["cost"], pos["shares"]
+                new_shares = old_shares + shares_added
+                new_cost = round((old_cost * old_shares + nav * shares_added) / new_shares, 4)
+            else:
+                new_shares = shares_added
+                new_cost = nav
+            upsert_position(account_id, code, new_cost, new_shares, conn)
+            conn.execute(
+                """
+                INSERT INTO transactions (account_id, code, op_type, amount_cny, confirm_date, confirm_nav, shares_added, cost_after, applied_at)
+                VALUES (?, ?, 'add', ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (account_id, code, amount_cny, confirm_date_str, nav, shares_added, new_cost),
+            )
         return {
             "ok": True,
             "confirm_date": confirm_date_str,
@@ -68,15 +64,14 @@ def add_position_trade(account_id: int, code: str, amount_cny: float, trade_ts:
             "shares_after": new_shares,
         }
     else:
-        cursor.execute(
-            """
-            INSERT INTO transactions (account_id, code, op_type, amount_cny, confirm_date, confirm_nav, shares_added, cost_after, applied_at)
-            VALUES (?, ?, 'add', ?, ?, NULL, NULL, NULL, NULL)
-            """,
-            (account_id, code, amount_cny, confirm_date_str),
-        )
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO transactions (account_id, code, op_type, amount_cny, confirm_date, confirm_nav, shares_added, cost_after, applied_at)
+                VALUES (?, ?, 'add', ?, ?, NULL, NULL, NULL, NULL)
+                """,
+                (account_id, code, amount_cny, confirm_date_str),
+            )
         return {
             "ok": True,
             "pending": True,
@@ -101,28 +96,24 @@ def reduce_position_trade(account_id: int, code: str, shares_redeemed: float, tr
     confirm_date_str = confirm_date_to_str(confirm_d)
     nav = get_nav_on_date(code, confirm_date_str)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     if nav and nav > 0:
         amount_cny = round(shares_redeemed * nav, 2)
         new_shares = round(pos["shares"] - shares_redeemed, 4)
         new_cost = pos["cost"]
-        if new_shares <= 0:
-            remove_position(account_id, code)
-            cost_after = 0.0
-        else:
-            upsert_position(account_id, code, new_cost, new_shares)
-            cost_after = new_cost
-        cursor.execute(
-            """
-            INSERT INTO transactions (account_id, code, op_type, amount_cny, shares_redeemed, confirm_date, confirm_nav, cost_after, applied_at)
-            VALUES (?, ?, 'reduce', ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            (account_id, code, amount_cny, shares_redeemed, confirm_date_str, nav, cost_after),
-        )
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            if new_shares <= 0:
+                remove_position(account_id, code, conn)
+                cost_after = 0.0
+            else:
+                upsert_position(account_id, code, new_cost, new_shares, conn)
+                cost_after = new_cost
+            conn.execute(
+                """
+                INSERT INTO transactions (account_id, code, op_type, amount_cny, shares_redeemed, confirm_date, confirm_nav, cost_after, applied_at)
+                VALUES (?, ?, 'reduce', ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (account_id, code, amount_cny, shares_redeemed, confirm_date_str, nav, cost_after),
+            )
         return {
             "ok": True,
             "confirm_date": confirm_date_str,
@@ -131,15 +122,14 @@ def reduce_position_trade(account_id: int, code: str, shares_redeemed: float, tr
             "shares_after": new_shares,
         }
     else:
-        cursor.execute(
-            """
-            INSERT INTO transactions (account_id, code, op_type, amount_cny, shares_redeemed, confirm_date, confirm_nav, cost_after, applied_at)
-            VALUES (?, ?, 'reduce', NULL, ?, ?, NULL, NULL, NULL)
-            """,
-            (account_id, code, shares_redeemed, confirm_date_str),
-        )
-        conn.commit()
-        conn.close()
+        with get_write_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO transactions (account_id, code, op_type, amount_cny, shares_redeemed, confirm_date, confirm_nav, cost_after, applied_at)
+                VALUES (?, ?, 'reduce', NULL, ?, ?, NULL, NULL, NULL)
+                """,
+                (account_id, code, shares_redeemed, confirm_date_str),
+            )
         return {
             "ok": True,
             "pending": True,
@@ -226,43 +216,39 @@ def process_pending_transactions() -> int:
         nav = get_nav_on_date(code, confirm_date) if confirm_date else None
         if not nav or nav <= 0:
             continue
-        conn = get_db_connection()
-        cursor = conn.cursor()
         if op_type == "add" and amount_cny:
             shares_added = round(amount_cny / nav, 4)
-            pos = _get_position(account_id, code)
-            if pos:
-                old_c, old_s = pos["cost"], pos["shares"]
-                new_shares = old_s + shares_added
-                new_cost = round((old_c * old_s + nav * shares_added) / new_shares, 4)
-            else:
-                new_shares = shares_added
-                new_cost = nav
-            upsert_position(account_id, code, new_cost, new_shares)
-            cursor.execute(
-                "UPDATE transactions SET confirm_nav = ?, shares_added = ?, cost_after = ?, applied_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (nav, shares_added, new_cost, tid),
-            )
+            with get_write_connection() as conn:
+                pos = _get_position(account_id, code, conn)
+                if pos:
+                    old_c, old_s = pos["cost"], pos["shares"]
+                    new_shares = old_s + shares_added
+                    new_cost = round((old_c * old_s + nav * shares_added) / new_shares, 4)
+                else:
+                    new_shares = shares_added
+                    new_cost = nav
+                upsert_position(account_id, code, new_cost, new_shares, conn)
+                conn.execute(
+                    "UPDATE transactions SET confirm_nav = ?, shares_added = ?, cost_after = ?, applied_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (nav, shares_added, new_cost, tid),
+                )
         elif op_type == "reduce" and shares_redeemed:
-            pos = _get_position(account_id, code)
-            if not pos:
-                conn.close()
-                continue
-            amount_cny = round(shares_redeemed * nav, 2)
-            new_shares = round(pos["shares"] - shares_redeemed, 4)
-            cost_after = pos["cost"] if new_shares > 0 else 0.0
-            if new_shares <= 0:
-                remove_position(account_id, code)
-            else:
-                upsert_position(account_id, code, pos["cost"], new_shares)
-            cursor.execute(
-                "UPDATE transactions SET confirm_nav = ?, amount_cny = ?, cost_after = ?, applied_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (nav, amount_cny, cost_after, tid),
-            )
+            with get_write_connection() as conn:
+                pos = _get_position(account_id, code, conn)
+                if not pos:
+                    continue
+                amount_cny = round(shares_redeemed * nav, 2)
+                new_shares = round(pos["shares"] - shares_redeemed, 4)
+                cost_after = pos["cost"] if new_shares > 0 else 0.0
+                if new_shares <= 0:
+                    remove_position(account_id, code, conn)
+                else:
+                    upsert_position(account_id, code, pos["cost"], new_shares, conn)
+                conn.execute(
+                    "UPDATE transactions SET confirm_nav = ?, amount_cny = ?, cost_after = ?, applied_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (nav, amount_cny, cost_after, tid),
+                )
         else:
-            conn.close()
             continue
-        conn.commit()
-        conn.close()
         applied += 1
     return applied
@@ -0,0 +1,80 @@
+-- Base schema (the schema version lives in PRAGMA user_version)
+
+-- Funds table - simplistic design, exactly what we need
+CREATE TABLE IF NOT EXISTS funds (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create an index for searching names, it's cheap and speeds up "LIKE" queries
+CREATE INDEX IF NOT EXISTS idx_funds_name ON funds(name);
+
+-- Positions table - store user holdings
+CREATE TABLE IF NOT EXISTS positions (
+    code TEXT PRIMARY KEY,
+    cost REAL NOT NULL DEFAULT 0.0,
+    shares REAL NOT NULL DEFAULT 0.0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Subscriptions table - store email alert settings
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT NOT NULL,
+    email TEXT NOT NULL,
+    threshold_up REAL,
+    threshold_down REAL,
+    enable_digest INTEGER DEFAULT 0,
+    digest_time TEXT DEFAULT '14:45',
+    enable_volatility INTEGER DEFAULT 1,
+    last_notified_at TIMESTAMP,
+    last_digest_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(code, email)
+);
+
+-- Settings table - store user configuration (for client/desktop)
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    encrypted INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Transactions table - add/reduce position log (T+1 confirm by real NAV)
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    code TEXT NOT NULL,
+    op_type TEXT NOT NULL,
+    amount_cny REAL,
+    shares_redeemed REAL,
+    confirm_date TEXT NOT NULL,
+    confirm_nav REAL,
+    shares_added REAL,
+    cost_after REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    applied_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_code ON transactions(code);
+CREATE INDEX IF NOT EXISTS idx_transactions_confirm_date ON transactions(confirm_date);
+
+-- Fund history table - cache historical NAV data
+CREATE TABLE IF NOT EXISTS fund_history (
+    code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    nav REAL NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (code, date)
+);
+CREATE INDEX IF NOT EXISTS idx_fund_history_date ON fund_history(date);
+
+-- Intraday snapshots table - store intraday valuation data for charts
+CREATE TABLE IF NOT EXISTS fund_intraday_snapshots (
+    fund_code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    estimate REAL NOT NULL,
+    PRIMARY KEY (fund_code, date, time)
+);
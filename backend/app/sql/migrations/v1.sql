@@ -0,0 +1,2 @@
+-- v1: drop old incompatible tables
+DROP TABLE IF EXISTS valuation_accuracy;
@@ -0,0 +1,5 @@
+-- v10: covering index for per-fund NAV history reads
+-- "WHERE code = ? [AND date range] ORDER BY date" reads (date, nav) straight
+-- from the index; the old code-only index is a prefix of it and goes away.
+CREATE INDEX IF NOT EXISTS idx_fund_history_code_date ON fund_history(code, date DESC, nav);
+DROP INDEX IF EXISTS idx_fund_history_code;
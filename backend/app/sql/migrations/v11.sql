@@ -0,0 +1,4 @@
+-- v11: partial index over pending (suggested) rebalance orders
+-- Only pending rows are indexed, so the batch "any orders left?" checks
+-- search a small index instead of scanning every order ever generated.
+CREATE INDEX IF NOT EXISTS idx_rebalance_orders_pending ON rebalance_orders(batch_id) WHERE status = 'suggested';
@@ -0,0 +1,59 @@
+-- v12: store the key-addressed tables WITHOUT ROWID
+-- Rows live in the primary-key B-tree itself, so PK lookups and range scans
+-- skip the extra rowid hop. Each table is rebuilt and renamed into place;
+-- nothing references these tables, so the renames don't touch other schemas.
+
+-- fund_history: (code, date) is the clustered key now, which also makes the
+-- v10 covering index redundant.
+CREATE TABLE fund_history_new (
+    code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    nav REAL NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (code, date)
+) WITHOUT ROWID;
+INSERT INTO fund_history_new (code, date, nav, updated_at)
+    SELECT code, date, nav, updated_at FROM fund_history;
+DROP TABLE fund_history;
+ALTER TABLE fund_history_new RENAME TO fund_history;
+CREATE INDEX IF NOT EXISTS idx_fund_history_date ON fund_history(date);
+
+CREATE TABLE fund_intraday_snapshots_new (
+    fund_code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    estimate REAL NOT NULL,
+    PRIMARY KEY (fund_code, date, time)
+) WITHOUT ROWID;
+INSERT INTO fund_intraday_snapshots_new (fund_code, date, time, estimate)
+    SELECT fund_code, date, time, estimate FROM fund_intraday_snapshots;
+DROP TABLE fund_intraday_snapshots;
+ALTER TABLE fund_intraday_snapshots_new RENAME TO fund_intraday_snapshots;
+
+-- positions: account_id leads the key, so the old per-account index goes away.
+CREATE TABLE positions_new (
+    account_id INTEGER NOT NULL DEFAULT 1,
+    code TEXT NOT NULL,
+    cost REAL NOT NULL DEFAULT 0.0,
+    shares REAL NOT NULL DEFAULT 0.0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (account_id, code),
+    FOREIGN KEY (account_id) REFERENCES accounts(id) ON DELETE RESTRICT
+) WITHOUT ROWID;
+INSERT INTO positions_new (account_id, code, cost, shares, updated_at)
+    SELECT account_id, code, cost, shares, updated_at FROM positions;
+DROP TABLE positions;
+ALTER TABLE positions_new RENAME TO positions;
+CREATE INDEX IF NOT EXISTS idx_positions_code ON positions(code);
+
+-- settings: a WITHOUT ROWID key can't be NULL; such rows were unreachable anyway.
+CREATE TABLE settings_new (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    encrypted INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+INSERT INTO settings_new (key, value, encrypted, updated_at)
+    SELECT key, value, encrypted, updated_at FROM settings WHERE key IS NOT NULL;
+DROP TABLE settings;
+ALTER TABLE settings_new RENAME TO settings;
@@ -0,0 +1,12 @@
+-- v13: one backtest cache row per query key, including NULL version_id
+-- The v9 unique index treats NULL version_ids as distinct, so INSERT OR
+-- REPLACE kept appending rows for portfolios without a version. Keep the
+-- newest row per key and index the same COALESCE the lookup filters on.
+DELETE FROM strategy_backtest_cache
+WHERE id NOT IN (
+    SELECT MAX(id) FROM strategy_backtest_cache
+    GROUP BY portfolio_id, account_id, COALESCE(version_id, 0), query_hash, data_tag
+);
+DROP INDEX IF EXISTS idx_backtest_cache_unique;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_backtest_cache_key
+    ON strategy_backtest_cache(portfolio_id, account_id, COALESCE(version_id, 0), query_hash, data_tag);
@@ -0,0 +1,24 @@
+-- v14: trigram full-text index over fund codes and names
+-- search_funds matches substrings (LIKE '%q%'), which scans the whole fund
+-- list. The trigram tokenizer indexes every 3-character window, so substring
+-- queries of 3+ characters become index lookups. External content: the rows
+-- stay in funds and the triggers below keep the index in step with them.
+CREATE VIRTUAL TABLE IF NOT EXISTS funds_fts USING fts5(
+    code, name, content='funds', content_rowid='rowid', tokenize='trigram'
+);
+INSERT INTO funds_fts(funds_fts) VALUES('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS funds_fts_ai AFTER INSERT ON funds BEGIN
+    INSERT INTO funds_fts(rowid, code, name) VALUES (new.rowid, new.code, new.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS funds_fts_ad AFTER DELETE ON funds BEGIN
+    INSERT INTO funds_fts(funds_fts, rowid, code, name) VALUES ('delete', old.rowid, old.code, old.name);
+END;
+
+-- The daily sync rewrites every row; only reindex the ones whose text changed
+CREATE TRIGGER IF NOT EXISTS funds_fts_au AFTER UPDATE OF code, name ON funds
+WHEN old.code IS NOT new.code OR old.name IS NOT new.name BEGIN
+    INSERT INTO funds_fts(funds_fts, rowid, code, name) VALUES ('delete', old.rowid, old.code, old.name);
+    INSERT INTO funds_fts(rowid, code, name) VALUES (new.rowid, new.code, new.name);
+END;
@@ -0,0 +1,7 @@
+-- v2: add account_id to positions in place (existing rows land in account 1)
+-- ALTER can't widen the primary key; v12 rebuilds the table with
+-- PRIMARY KEY (account_id, code), and both run in the same init transaction.
+ALTER TABLE positions ADD COLUMN account_id INTEGER NOT NULL DEFAULT 1
+    REFERENCES accounts(id) ON DELETE RESTRICT;
+CREATE INDEX IF NOT EXISTS idx_positions_account ON positions(account_id);
+CREATE INDEX IF NOT EXISTS idx_positions_code ON positions(code);
@@ -0,0 +1,6 @@
+-- v2: add account_id to transactions in place (existing rows land in account 1)
+ALTER TABLE transactions ADD COLUMN account_id INTEGER NOT NULL DEFAULT 1
+    REFERENCES accounts(id) ON DELETE RESTRICT;
+CREATE INDEX IF NOT EXISTS idx_transactions_account ON transactions(account_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_code ON transactions(code);
+CREATE INDEX IF NOT EXISTS idx_transactions_confirm_date ON transactions(confirm_date);
@@ -0,0 +1,2 @@
+-- v4: unique prompt names
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ai_prompts_name ON ai_prompts(name);
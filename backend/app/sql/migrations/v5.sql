@@ -0,0 +1,65 @@
+-- v5: strategy portfolio tables
+CREATE TABLE IF NOT EXISTS strategy_portfolios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    account_id INTEGER NOT NULL,
+    benchmark TEXT DEFAULT '000300',
+    fee_rate REAL DEFAULT 0.001,
+    scope_codes TEXT DEFAULT '[]',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (account_id) REFERENCES accounts(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS strategy_versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL,
+    version_no INTEGER NOT NULL,
+    effective_date TEXT NOT NULL,
+    note TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (portfolio_id) REFERENCES strategy_portfolios(id) ON DELETE CASCADE,
+    UNIQUE(portfolio_id, version_no)
+);
+
+CREATE TABLE IF NOT EXISTS strategy_holdings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    version_id INTEGER NOT NULL,
+    fund_code TEXT NOT NULL,
+    target_weight REAL NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (version_id) REFERENCES strategy_versions(id) ON DELETE CASCADE,
+    UNIQUE(version_id, fund_code)
+);
+
+CREATE TABLE IF NOT EXISTS rebalance_orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL,
+    version_id INTEGER NOT NULL,
+    account_id INTEGER NOT NULL,
+    fund_code TEXT NOT NULL,
+    fund_name TEXT,
+    action TEXT NOT NULL,
+    target_weight REAL NOT NULL,
+    current_weight REAL NOT NULL,
+    target_shares REAL NOT NULL,
+    current_shares REAL NOT NULL,
+    delta_shares REAL NOT NULL,
+    price REAL NOT NULL,
+    trade_amount REAL NOT NULL,
+    fee REAL DEFAULT 0,
+    status TEXT DEFAULT 'suggested',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    executed_at TIMESTAMP,
+    FOREIGN KEY (portfolio_id) REFERENCES strategy_portfolios(id) ON DELETE CASCADE,
+    FOREIGN KEY (version_id) REFERENCES strategy_versions(id) ON DELETE CASCADE,
+    FOREIGN KEY (account_id) REFERENCES accounts(id) ON DELETE CASCADE
+);
+
+-- Indexes, created once the tables above exist
+CREATE INDEX IF NOT EXISTS idx_strategy_portfolios_account ON strategy_portfolios(account_id);
+CREATE INDEX IF NOT EXISTS idx_strategy_versions_portfolio ON strategy_versions(portfolio_id);
+CREATE INDEX IF NOT EXISTS idx_strategy_versions_active ON strategy_versions(portfolio_id, is_active);
+CREATE INDEX IF NOT EXISTS idx_strategy_holdings_version ON strategy_holdings(version_id);
+CREATE INDEX IF NOT EXISTS idx_rebalance_orders_portfolio ON rebalance_orders(portfolio_id, account_id, status);
@@ -0,0 +1,16 @@
+-- v8: rebalance batches (rebalance_orders.batch_id is added by init_db if missing)
+CREATE TABLE IF NOT EXISTS rebalance_batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL,
+    account_id INTEGER NOT NULL,
+    version_id INTEGER,
+    source TEXT DEFAULT 'auto',
+    status TEXT DEFAULT 'pending',
+    title TEXT,
+    note TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    FOREIGN KEY (portfolio_id) REFERENCES strategy_portfolios(id) ON DELETE CASCADE,
+    FOREIGN KEY (account_id) REFERENCES accounts(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_rebalance_batches_portfolio ON rebalance_batches(portfolio_id, account_id, status);
@@ -0,0 +1,17 @@
+-- v9: strategy backtest cache
+CREATE TABLE IF NOT EXISTS strategy_backtest_cache (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id INTEGER NOT NULL,
+    account_id INTEGER NOT NULL,
+    version_id INTEGER,
+    query_hash TEXT NOT NULL,
+    data_tag TEXT NOT NULL,
+    result_json TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (portfolio_id) REFERENCES strategy_portfolios(id) ON DELETE CASCADE,
+    FOREIGN KEY (account_id) REFERENCES accounts(id) ON DELETE CASCADE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_backtest_cache_unique
+    ON strategy_backtest_cache(portfolio_id, account_id, version_id, query_hash, data_tag);
+CREATE INDEX IF NOT EXISTS idx_backtest_cache_lookup
+    ON strategy_backtest_cache(portfolio_id, account_id, version_id, created_at DESC);